@@ -0,0 +1,111 @@
+"""
+Alpha Vantage Client
+Single entry point for Alpha Vantage queries so every call shares the same
+rate limiter and response cache
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from cache_store import MemoryLRUCache, SQLiteCache, TieredCache, cache_path
+from http_client import AttemptRejected, HttpClient, default_http_client
+from rate_limiter import RateLimiter, alpha_vantage_limiter
+from single_flight import SingleFlight
+
+ALPHA_VANTAGE_URL = "https://www.alphavantage.co/query"
+
+# A per-minute "Note" clears once this window has passed; retrying sooner only spends tokens
+THROTTLE_WINDOW_SECONDS = 60.0
+
+# Freshness per function (seconds). Functions not listed are never cached.
+ALPHA_VANTAGE_TTLS = {
+    "GLOBAL_QUOTE": 60,
+    "TIME_SERIES_DAILY": 6 * 3600,
+    "OVERVIEW": 24 * 3600,
+    "INCOME_STATEMENT": 24 * 3600,
+    "BALANCE_SHEET": 24 * 3600,
+    "CASH_FLOW": 24 * 3600,
+    "SYMBOL_SEARCH": 14 * 24 * 3600,
+}
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+# Identical requests in flight at the same time (e.g. two analysts opening the same
+# ticker, or forecast_stock and plot_chart in one turn) share one outbound call
+alpha_vantage_flights = SingleFlight()
+
+
+def get_alpha_vantage_cache() -> TieredCache:
+    """Process-wide response cache: in-memory LRU in front of a local SQLite file."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = TieredCache(MemoryLRUCache(max_entries=512),
+                                        SQLiteCache(cache_path("ALPHA_VANTAGE_CACHE_PATH", "alpha_vantage.sqlite"),
+                                                    max_entries=20000))
+        return _shared_cache
+
+
+def is_rate_limited(data: Dict[str, Any]) -> bool:
+    """Alpha Vantage signals throttling with a 200 response carrying Note/Information."""
+    return isinstance(data, dict) and ("Note" in data or "Information" in data)
+
+
+def is_minute_throttle(data: Dict[str, Any]) -> bool:
+    """Only "Note" is the per-minute limit; "Information" (daily limit, premium-only
+    endpoint) will not clear on a retry."""
+    return isinstance(data, dict) and "Note" in data
+
+
+def cache_key(function: str, params: Dict[str, Any]) -> str:
+    """(function, symbol/keywords, ...) key; symbols and search keywords are case-insensitive."""
+    parts = [f"{k}={str(v).strip().upper()}" for k, v in sorted(params.items())]
+    return f"{function}|{'&'.join(parts)}"
+
+
+class AlphaVantageClient:
+    """Thin Alpha Vantage wrapper: serves fresh cached responses, otherwise waits
+    for a rate-limit token and queries the API (per-minute throttle notices are retried
+    after the throttle window when the caller is willing to wait that long)"""
+
+    def __init__(self, api_key: str, limiter: RateLimiter = alpha_vantage_limiter,
+                 cache: Optional[TieredCache] = None, http: Optional[HttpClient] = None, timeout: float = 10,
+                 url: str = ALPHA_VANTAGE_URL, max_wait: Optional[float] = None):
+        self.api_key = api_key
+        self.limiter = limiter
+        self.cache = cache if cache is not None else get_alpha_vantage_cache()
+        self.http = http or default_http_client
+        self.timeout = timeout
+        self.url = url
+        self.max_wait = max_wait  # longest wait for a rate-limit token (None: the limiter's default)
+
+    def query(self, function: str, timeout: float = None, **params) -> Dict[str, Any]:
+        """Call one Alpha Vantage function, e.g. query("OVERVIEW", symbol="IBM")."""
+        ttl = ALPHA_VANTAGE_TTLS.get(function)
+        key = cache_key(function, params)
+        if ttl:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        return alpha_vantage_flights.do(key, lambda: self._fetch(function, params, key, ttl, timeout))
+
+    def _fetch(self, function, params, key, ttl, timeout):
+        query_params = {"function": function, **params, "apikey": self.api_key}
+        max_wait = self.limiter.max_wait if self.max_wait is None else self.max_wait
+        try:
+            # Every attempt, including retries, spends a rate-limit token
+            data = self.http.get_json(self.url, params=query_params, timeout=timeout or self.timeout,
+                                      retry_if=is_minute_throttle if max_wait >= THROTTLE_WINDOW_SECONDS else None,
+                                      retry_delay=THROTTLE_WINDOW_SECONDS,
+                                      before_attempt=lambda: self.limiter.acquire(self.max_wait))
+        except AttemptRejected:
+            # Same shape as an API throttle response so callers handle both alike
+            return {"Information": "Local Alpha Vantage call budget exhausted; try again later."}
+
+        # Never cache throttle notices, errors or empty bodies
+        if ttl and data and not is_rate_limited(data) and "Error Message" not in data:
+            self.cache.set(key, data, ttl=ttl)
+        return data
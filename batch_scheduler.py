@@ -0,0 +1,135 @@
+"""
+Batch Ticker Analysis
+Schedules analyze_stock for many tickers: data fetches share the Alpha Vantage
+budget (and its response cache), LLM risk prompts run concurrently up to a cap,
+and results are yielded as each ticker finishes
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from queue import Queue
+from typing import Any, Dict, Iterator, List, Tuple
+
+from agent import FUNDAMENTALS_FUNCTIONS
+from alpha_vantage import AlphaVantageClient, cache_key
+
+BATCH_FETCH_WORKERS = int(os.getenv("BATCH_FETCH_WORKERS", "2"))
+BATCH_LLM_WORKERS = int(os.getenv("BATCH_LLM_WORKERS", "4"))
+BATCH_MAX_TICKERS = int(os.getenv("BATCH_MAX_TICKERS", "100"))
+
+# NewsAPI requests one batch may plan for its sentiment lookups (0: no limit)
+BATCH_NEWS_BUDGET = int(os.getenv("BATCH_NEWS_BUDGET", "0"))
+
+# A batch ticker waits this long for a per-minute token instead of failing fast
+BATCH_MAX_WAIT = float(os.getenv("BATCH_MAX_WAIT", "600"))
+
+
+def normalize_tickers(tickers: List[str]) -> List[str]:
+    """Uppercased tickers with blanks and duplicates removed, first occurrence order kept."""
+    seen = {}
+    for ticker in tickers:
+        ticker = (ticker or "").strip().upper()
+        if ticker:
+            seen.setdefault(ticker, None)
+    return list(seen)
+
+
+class BatchScheduler:
+    """Two-stage pipeline over one agent: fetch workers gather data, LLM workers assess it"""
+
+    def __init__(self, agent, fetch_workers: int = BATCH_FETCH_WORKERS, llm_workers: int = BATCH_LLM_WORKERS,
+                 max_wait: float = BATCH_MAX_WAIT):
+        self.agent = agent
+        self.fetch_workers = fetch_workers
+        self.llm_workers = llm_workers
+        # Same limiter, cache and connection pools as the agent; only the token wait differs
+        self.av = AlphaVantageClient(agent.av.api_key, limiter=agent.av.limiter, cache=agent.av.cache,
+                                     http=agent.av.http, timeout=agent.av.timeout, url=agent.av.url,
+                                     max_wait=max_wait)
+
+    def call_cost(self, ticker: str) -> Dict[str, int]:
+        """
+        Most calls a ticker can need given what is already cached: Alpha Vantage (the
+        fundamentals, plus the OVERVIEW retry _gather_stock_data makes when OVERVIEW
+        comes back empty) and NewsAPI (the sentiment fallback strategies).
+        Cache probes do not count as hits or change LRU order.
+        """
+        missing = [f for f in FUNDAMENTALS_FUNCTIONS if not self.av.cache.contains(cache_key(f, {"symbol": ticker}))]
+        return {
+            "alpha_vantage": len(missing) + ("OVERVIEW" in missing),
+            "newsapi": self.agent.sentiment_analyzer.news_calls(ticker),
+        }
+
+    def plan(self, tickers: List[str]) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """
+        Split tickers into accepted ones and (ticker, reason) pairs over budget: the
+        remaining daily Alpha Vantage budget and BATCH_NEWS_BUDGET. Fully cached
+        tickers are always accepted.
+        """
+        status = self.av.limiter.status()
+        remaining = status.get("tokens_day", float("inf"))
+        news_remaining = BATCH_NEWS_BUDGET or float("inf")
+        accepted, over_budget = [], []
+        for ticker in normalize_tickers(tickers):
+            cost = self.call_cost(ticker)
+            if cost["alpha_vantage"] > remaining:
+                over_budget.append((ticker, "Daily Alpha Vantage budget exhausted"))
+                continue
+            if cost["newsapi"] > news_remaining:
+                over_budget.append((ticker, "Batch NewsAPI budget exhausted"))
+                continue
+            remaining -= cost["alpha_vantage"]
+            news_remaining -= cost["newsapi"]
+            accepted.append(ticker)
+        return accepted, over_budget
+
+    def _analyze(self, stock_data: Dict[str, Any]) -> Dict[str, Any]:
+        metrics = self.agent._build_stock_analysis(stock_data)
+        return {"ticker": stock_data["ticker"], "status": "ok", "metrics": metrics}
+
+    def run(self, tickers: List[str]) -> Iterator[Dict[str, Any]]:
+        """Yield one result dict per ticker, in completion order. Tickers past
+        BATCH_MAX_TICKERS or over budget are reported as skipped."""
+        tickers = normalize_tickers(tickers)
+        for ticker in tickers[BATCH_MAX_TICKERS:]:
+            yield {"ticker": ticker, "status": "skipped", "error": f"Batch limit of {BATCH_MAX_TICKERS} tickers exceeded"}
+
+        accepted, over_budget = self.plan(tickers[:BATCH_MAX_TICKERS])
+        for ticker, reason in over_budget:
+            yield {"ticker": ticker, "status": "skipped", "error": reason}
+        if not accepted:
+            return
+
+        results: Queue = Queue()
+        fetch_pool = ThreadPoolExecutor(max_workers=self.fetch_workers)
+        llm_pool = ThreadPoolExecutor(max_workers=self.llm_workers)
+
+        def on_analyzed(ticker: str, future: Future):
+            try:
+                results.put(future.result())
+            except Exception as e:
+                results.put({"ticker": ticker, "status": "error", "error": str(e)})
+
+        def on_fetched(ticker: str, future: Future):
+            try:
+                stock_data = future.result()
+                # The fetch worker moves on to the next ticker while this one is assessed
+                llm_pool.submit(self._analyze, stock_data).add_done_callback(lambda f: on_analyzed(ticker, f))
+            except Exception as e:
+                results.put({"ticker": ticker, "status": "error", "error": str(e)})
+
+        start = time.time()
+        try:
+            for ticker in accepted:
+                future = fetch_pool.submit(self.agent._gather_stock_data, ticker, self.av)
+                future.add_done_callback(lambda f, t=ticker: on_fetched(t, f))
+
+            for _ in accepted:
+                result = results.get()
+                result["elapsed_seconds"] = round(time.time() - start, 2)
+                yield result
+        finally:
+            # A closed stream (client went away) drops the tickers not yet started
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            llm_pool.shutdown(wait=False)
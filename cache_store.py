@@ -0,0 +1,176 @@
+"""
+Persistent Cache Store
+Small SQLite-backed key/value cache with TTL, size-bounded LRU eviction and hit/miss counters
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+
+def cache_path(env_var: str, name: str) -> str:
+    """Location of one cache: $env_var if set, else <FINANALYST_CACHE_DIR>/<name>.
+    The environment is read on every call, not at import, so caches created after it
+    changes (e.g. by network_stubs.isolated_cache_env) follow it."""
+    return os.getenv(env_var) or os.path.join(os.getenv("FINANALYST_CACHE_DIR", ".cache"), name)
+
+
+class SQLiteCache:
+    """JSON values in a local SQLite file; expired or least recently used rows are evicted"""
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created REAL NOT NULL, expires REAL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        """Return (value, expires_at) for a live entry, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def contains(self, key: str) -> bool:
+        """Whether a live entry exists; unlike get, touches neither recency nor hit/miss counters."""
+        with self._lock:
+            row = self._conn.execute("SELECT expires FROM cache WHERE key = ?", (key,)).fetchone()
+        return row is not None and (row[0] is None or row[0] >= time.time())
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serialisable value. `ttl` (seconds) overrides the cache default."""
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value), now, expires, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            # Amortise eviction: the count query is cheap but not free
+            if self._writes % 50 == 0:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires < ?", (now,))
+        count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,),
+            )
+        self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+class MemoryLRUCache:
+    """In-process LRU with per-entry expiry; the hot tier in front of SQLiteCache"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, Optional[float]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] is not None and entry[1] < time.time()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def contains(self, key: str) -> bool:
+        """Whether a live entry exists; unlike get, touches neither recency nor hit/miss counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry[1] is None or entry[1] >= time.time())
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, expires: Optional[float] = None) -> None:
+        """Store a value for `ttl` seconds (or until the absolute `expires` time)."""
+        if expires is None and ttl:
+            expires = time.time() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+class TieredCache:
+    """Memory LRU backed by a persistent SQLite tier; persistent hits are promoted to memory"""
+
+    def __init__(self, memory: MemoryLRUCache, persistent: SQLiteCache):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.memory.get_entry(key)
+        if entry is not None:
+            return entry[0]
+        entry = self.persistent.get_entry(key)
+        if entry is None:
+            return None
+        # Keep the original expiry so promotion never extends freshness
+        self.memory.set(key, entry[0], expires=entry[1])
+        return entry[0]
+
+    def contains(self, key: str) -> bool:
+        return self.memory.contains(key) or self.persistent.contains(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl=ttl)
+        self.persistent.set(key, value, ttl=ttl)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {"memory": self.memory.stats(), "persistent": self.persistent.stats()}
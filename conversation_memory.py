@@ -0,0 +1,101 @@
+"""
+Conversation Memory
+Keeps chat prompts within a token budget: recent turns are sent verbatim and
+older turns are folded into an incrementally updated running summary
+"""
+
+import os
+from langchain_core.messages import SystemMessage, HumanMessage
+
+CHAT_HISTORY_MAX_TOKENS = int(os.getenv("CHAT_HISTORY_MAX_TOKENS", "3000"))
+CHAT_HISTORY_KEEP_TURNS = int(os.getenv("CHAT_HISTORY_KEEP_TURNS", "4"))
+
+# Fallback summary cap (characters) when the summarisation call fails
+MAX_SUMMARY_CHARS = 2000
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token plus per-message overhead)."""
+    return len(text) // 4 + 4
+
+
+class ConversationMemory:
+    """Token-budgeted prompt view over the full chat transcript.
+
+    The transcript itself (agent.history) is never modified, so reports can
+    still render the whole conversation.
+    """
+
+    def __init__(self, llm, max_tokens: int = CHAT_HISTORY_MAX_TOKENS,
+                 keep_last_turns: int = CHAT_HISTORY_KEEP_TURNS):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.keep_last_turns = keep_last_turns
+        self.reset()
+
+    def reset(self):
+        self.summary = ""
+        self._summary_tokens = 0
+        self._token_counts = []   # token estimate per transcript message
+        self._window_start = 0    # first transcript index still sent verbatim
+        self._window_tokens = 0   # running total of the verbatim window
+
+    def prompt_messages(self, history):
+        """Messages to send in place of the full history: [summary] + recent turns."""
+        self._sync(history)
+        messages = []
+        if self.summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+        return messages + history[self._window_start:]
+
+    def _sync(self, history):
+        if len(history) < len(self._token_counts):
+            # Transcript was cleared (e.g. /api/reset)
+            self.reset()
+
+        # Count only messages added since the last turn
+        for message in history[len(self._token_counts):]:
+            tokens = estimate_tokens(str(message.content))
+            self._token_counts.append(tokens)
+            self._window_tokens += tokens
+
+        keep_messages = self.keep_last_turns * 2
+        folded = []
+        while (self._window_tokens + self._summary_tokens > self.max_tokens
+               and len(history) - self._window_start > keep_messages):
+            folded.append(history[self._window_start])
+            self._window_tokens -= self._token_counts[self._window_start]
+            self._window_start += 1
+            # Fold whole turns so the window never starts with an answer
+            while (self._window_start < len(history)
+                   and not isinstance(history[self._window_start], HumanMessage)):
+                folded.append(history[self._window_start])
+                self._window_tokens -= self._token_counts[self._window_start]
+                self._window_start += 1
+
+        if folded:
+            self._update_summary(folded)
+
+    def _update_summary(self, folded):
+        """Merge newly folded messages into the running summary (one LLM call)."""
+        transcript = "\n".join(
+            f"{'User' if isinstance(m, HumanMessage) else 'Analyst'}: {m.content}" for m in folded
+        )
+        prompt = f"""
+        Update the running summary of a conversation between a user and a financial analyst.
+        Keep tickers, figures, conclusions and open questions. Maximum 150 words.
+
+        Current summary:
+        {self.summary or "(empty)"}
+
+        New messages:
+        {transcript}
+
+        Return ONLY the updated summary text.
+        """
+        try:
+            self.summary = self.llm.invoke(prompt).content.strip()
+        except Exception as e:
+            print(f"Conversation summary update failed: {e}")
+            self.summary = f"{self.summary}\n{transcript}"[-MAX_SUMMARY_CHARS:]
+        self._summary_tokens = estimate_tokens(self.summary)
@@ -0,0 +1,126 @@
+"""
+HTTP Client
+Shared keep-alive sessions with per-host connection pools and retry with
+exponential backoff + jitter for all outbound data calls
+"""
+
+import os
+import time
+import random
+import threading
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from typing import Any, Callable, Collection, Dict, Optional
+from urllib.parse import urlparse
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+
+# Connection pool size per host (concurrent keep-alive connections)
+HTTP_POOL_SIZES = {
+    "www.alphavantage.co": 8,
+    "newsapi.org": 6,
+}
+DEFAULT_POOL_SIZE = 4
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class AttemptRejected(Exception):
+    """Raised when a before_attempt hook refuses another attempt (e.g. call budget exhausted)."""
+
+
+class HttpClient:
+    """GET-and-parse-JSON client reusing one pooled session per host"""
+
+    def __init__(self, timeout: float = HTTP_TIMEOUT, max_retries: int = HTTP_MAX_RETRIES,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 pool_sizes: Optional[Dict[str, int]] = None, adapter: Optional[BaseAdapter] = None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_sizes = pool_sizes if pool_sizes is not None else HTTP_POOL_SIZES
+        self.adapter = adapter  # transport override (e.g. network_stubs.StubAdapter)
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "retries": 0, "failures": 0}
+
+    def _session(self, host: str) -> requests.Session:
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                adapter = self.adapter
+                if adapter is None:
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_sizes.get(host, DEFAULT_POOL_SIZE))
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": spreads out retries from concurrent callers
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get_json(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[float] = None,
+                 retry_if: Optional[Callable[[Any], bool]] = None, retry_delay: float = 0.0,
+                 before_attempt: Optional[Callable[[], bool]] = None,
+                 retry_status: Collection[int] = RETRYABLE_STATUS, max_retries: Optional[int] = None) -> Any:
+        """
+        GET a URL and return the decoded JSON body.
+
+        Connection errors, timeouts and `retry_status` responses (429/5xx by default)
+        are retried with backoff.
+        `retry_if(body)` marks otherwise successful bodies as retryable (e.g. API
+        throttle notices); after the last attempt such a body is returned as is.
+        Those retries wait at least `retry_delay` seconds (e.g. the API's throttle window).
+        `before_attempt()` runs before every attempt; returning False raises AttemptRejected.
+        `max_retries` overrides the client's retry count for this call.
+        """
+        session = self._session(urlparse(url).netloc)
+        min_delay = 0.0
+        max_retries = self.max_retries if max_retries is None else max_retries
+        for attempt in range(max_retries + 1):
+            if attempt:
+                self._count("retries")
+                time.sleep(max(min_delay, self._backoff(attempt)))
+                min_delay = 0.0
+            if before_attempt and not before_attempt():
+                raise AttemptRejected(url)
+
+            self._count("requests")
+            last_attempt = attempt == max_retries
+            try:
+                response = session.get(url, params=params, timeout=timeout or self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    self._count("failures")
+                    raise
+                continue
+
+            if response.status_code in retry_status and not last_attempt:
+                continue
+            try:
+                data = response.json()
+            except ValueError:
+                self._count("failures")
+                raise
+            if retry_if and retry_if(data) and not last_attempt:
+                min_delay = retry_delay
+                continue
+            if response.status_code >= 400 or (retry_if and retry_if(data)):
+                self._count("failures")
+            return data
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+
+# Shared by the agent and the sentiment tool
+default_http_client = HttpClient()
@@ -0,0 +1,56 @@
+"""
+LLM Response Cache
+Caches deterministic (temperature=0) prompt completions keyed by model and normalized prompt
+"""
+
+import os
+import hashlib
+import threading
+from langchain_core.messages import AIMessage
+
+from cache_store import SQLiteCache, cache_path
+
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "24"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Process-wide response cache shared by all agents."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = SQLiteCache(cache_path("LLM_CACHE_PATH", "llm_cache.sqlite"),
+                                        ttl=LLM_CACHE_TTL_HOURS * 3600,
+                                        max_entries=LLM_CACHE_MAX_ENTRIES)
+        return _shared_cache
+
+
+class CachedLLM:
+    """Wraps a chat model's invoke() for single-string prompts with a persistent response cache"""
+
+    def __init__(self, llm, cache=None):
+        self.llm = llm
+        self.cache = cache or get_llm_cache()
+        model = getattr(llm, "model_name", None) or getattr(llm, "model", "")
+        self._model_key = f"{model}|{getattr(llm, 'temperature', '')}"
+
+    def _key(self, prompt: str) -> str:
+        # Prompts are indented f-strings; whitespace differences must not split the cache
+        normalized = " ".join(prompt.split())
+        return hashlib.sha256(f"{self._model_key}\n{normalized}".encode("utf-8")).hexdigest()
+
+    def invoke(self, prompt: str) -> AIMessage:
+        key = self._key(prompt)
+        content = self.cache.get(key)
+        if content is not None:
+            return AIMessage(content=content)
+
+        response = self.llm.invoke(prompt)
+        self.cache.set(key, response.content)
+        return response
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,291 @@
+"""
+Network Stubs
+Record/replay stand-ins for Alpha Vantage, NewsAPI and Groq so the agent and
+sentiment pipelines can run deterministically without network access.
+
+Record mode forwards each request upstream and saves the response as a fixture;
+replay mode serves fixtures only. Both are available as a local HTTP server
+(point the agent's base URLs at it) or as a requests transport adapter
+(inject via HttpClient(adapter=...)). Groq's SDK does not use requests, so Groq
+is stubbed through the server only.
+
+    python network_stubs.py --mode replay --port 8765 --latency 0.2 --throttle-every 5
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from cache_store import cache_path
+
+NETWORK_FIXTURES_DIR = os.getenv("NETWORK_FIXTURES_DIR", "fixtures")
+
+# Stubbed services: name -> real base URL
+UPSTREAMS = {
+    "alpha_vantage": "https://www.alphavantage.co",
+    "newsapi": "https://newsapi.org",
+    "groq": "https://api.groq.com",
+}
+_SERVICE_BY_HOST = {urlparse(url).netloc: name for name, url in UPSTREAMS.items()}
+
+# Credentials never reach a fixture key or file
+SECRET_PARAMS = {"apikey", "api_key"}
+FORWARDED_HEADERS = {"authorization", "x-api-key", "content-type", "accept"}
+
+# Responses each service gives when its quota is exceeded
+THROTTLE_RESPONSES = {
+    "alpha_vantage": (200, {"Note": "Thank you for using Alpha Vantage! Our standard API rate limit is 5 requests per minute."}),
+    "newsapi": (429, {"status": "error", "code": "rateLimited", "message": "You have made too many requests recently."}),
+    "groq": (429, {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}),
+}
+
+StubResponse = Tuple[int, str, bytes]  # (status, content type, body)
+
+
+def _json_response(status: int, body: Any) -> StubResponse:
+    return status, "application/json", json.dumps(body).encode("utf-8")
+
+
+def fixture_key(service: str, method: str, path: str, params: Dict[str, str], body: bytes = b"") -> str:
+    """Stable hash of a request with credentials removed."""
+    params = sorted((k, v) for k, v in params.items() if k.lower() not in SECRET_PARAMS)
+    try:
+        body_text = json.dumps(json.loads(body), sort_keys=True) if body else ""
+    except ValueError:
+        body_text = body.decode("utf-8", "replace")
+    raw = json.dumps([service, method.upper(), path.rstrip("/"), params, body_text])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """One JSON file per recorded response: <root>/<service>/<key>.json"""
+
+    def __init__(self, root: str = NETWORK_FIXTURES_DIR):
+        self.root = root
+
+    def _path(self, service: str, key: str) -> str:
+        return os.path.join(self.root, service, f"{key}.json")
+
+    def load(self, service: str, key: str) -> Optional[StubResponse]:
+        try:
+            with open(self._path(service, key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        return entry["status"], entry["content_type"], entry["body"].encode("utf-8")
+
+    def save(self, service: str, key: str, request: Dict[str, Any], response: StubResponse) -> None:
+        status, content_type, body = response
+        path = self._path(service, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"request": request, "status": status, "content_type": content_type,
+                       "body": body.decode("utf-8", "replace")}, f, indent=1)
+        os.replace(tmp, path)
+
+
+class StubResponder:
+    """Answers stubbed requests from fixtures (replay) or upstream (record), with
+    optional added latency and a throttle response on every Nth call per service"""
+
+    def __init__(self, store: FixtureStore, mode: str = "replay", latency: float = 0.0, throttle_every: int = 0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown stub mode: {mode}")
+        self.store = store
+        self.mode = mode
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self._upstream = requests.Session()
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        self.counters = {"hits": 0, "misses": 0, "recorded": 0, "throttled": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def handle(self, service: str, method: str, path: str, params: Dict[str, str],
+               body: bytes = b"", headers: Optional[Dict[str, str]] = None) -> StubResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+            throttled = bool(self.throttle_every) and self.calls[service] % self.throttle_every == 0
+        if throttled:
+            self._count("throttled")
+            return _json_response(*THROTTLE_RESPONSES[service])
+
+        key = fixture_key(service, method, path, params, body)
+        if self.mode == "replay":
+            response = self.store.load(service, key)
+            if response is None:
+                self._count("misses")
+                return _json_response(404, {"error": {"message": f"No {service} fixture for {method} {path}"}})
+            self._count("hits")
+            return response
+
+        upstream = self._upstream.request(
+            method, UPSTREAMS[service] + path, params=params, data=body or None, timeout=60,
+            headers={k: v for k, v in (headers or {}).items() if k.lower() in FORWARDED_HEADERS},
+        )
+        response = (upstream.status_code, upstream.headers.get("Content-Type", "application/json"), upstream.content)
+        # Throttle and server errors are simulated on replay rather than recorded
+        throttle_notice = service == "alpha_vantage" and (b'"Note"' in upstream.content or b'"Information"' in upstream.content)
+        if upstream.status_code < 400 and not throttle_notice:
+            redacted = {k: v for k, v in params.items() if k.lower() not in SECRET_PARAMS}
+            self.store.save(service, key, {"method": method, "path": path, "params": redacted}, response)
+            self._count("recorded")
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counters)
+
+
+class StubAdapter(BaseAdapter):
+    """requests transport that routes stubbed hosts through a StubResponder"""
+
+    def __init__(self, responder: StubResponder):
+        super().__init__()
+        self.responder = responder
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        url = urlparse(request.url)
+        service = _SERVICE_BY_HOST.get(url.netloc)
+        if service is None:
+            raise requests.ConnectionError(f"No stub for host {url.netloc}", request=request)
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        status, content_type, content = self.responder.handle(
+            service, request.method, url.path, dict(parse_qsl(url.query)), body, dict(request.headers))
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict({"Content-Type": content_type})
+        response._content = content
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class StubServer:
+    """Local HTTP server serving /<service>/<path> through a StubResponder"""
+
+    def __init__(self, responder: StubResponder, host: str = "127.0.0.1", port: int = 0):
+        self.responder = responder
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    def _handler(self):
+        responder = self.responder
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self):
+                url = urlparse(self.path)
+                service, _, path = url.path.lstrip("/").partition("/")
+                if service not in UPSTREAMS:
+                    status, content_type, body = _json_response(404, {"error": {"message": f"Unknown service {service}"}})
+                else:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    status, content_type, body = responder.handle(
+                        service, self.command, "/" + path, dict(parse_qsl(url.query)),
+                        self.rfile.read(length) if length else b"", dict(self.headers))
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """Base URL overrides read by FinancialAnalystAgent and SentimentAnalyzer."""
+        return {
+            "ALPHA_VANTAGE_URL": f"{self.base_url}/alpha_vantage/query",
+            "NEWS_API_URL": f"{self.base_url}/newsapi/v2/everything",
+            "GROQ_BASE_URL": f"{self.base_url}/groq",
+        }
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def isolated_cache_env(root: str) -> Dict[str, str]:
+    """Cache locations under `root`, so a stubbed run neither reads responses cached by
+    live runs nor leaves fixture data behind. Cache paths are resolved when each shared
+    cache is first created (the get_*() factories), so apply this before the first agent
+    or server is built. The VADER lexicon is not API data and stays shared."""
+    vader_lexicon = cache_path("VADER_LEXICON_JSON", "vader_lexicon.json")
+    return {
+        "FINANALYST_CACHE_DIR": root,
+        "PDF_CACHE_DIR": os.path.join(root, "pdf_text"),
+        "ALPHA_VANTAGE_CACHE_PATH": os.path.join(root, "alpha_vantage.sqlite"),
+        "LLM_CACHE_PATH": os.path.join(root, "llm_cache.sqlite"),
+        "PRICE_STORE_DIR": os.path.join(root, "prices"),
+        "SENTIMENT_HISTORY_PATH": os.path.join(root, "sentiment_history.sqlite"),
+        "VADER_LEXICON_JSON": os.path.abspath(vader_lexicon),
+    }
+
+
+def start_stub_server(mode: str = "replay", fixtures: str = NETWORK_FIXTURES_DIR, latency: float = 0.0,
+                      throttle_every: int = 0, port: int = 0) -> StubServer:
+    """Start a stub server in a background thread."""
+    responder = StubResponder(FixtureStore(fixtures), mode=mode, latency=latency, throttle_every=throttle_every)
+    return StubServer(responder, port=port).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record/replay stub server for Alpha Vantage, NewsAPI and Groq")
+    parser.add_argument("--mode", choices=("record", "replay"), default="replay")
+    parser.add_argument("--fixtures", default=NETWORK_FIXTURES_DIR)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Throttle every Nth call per service")
+    parser.add_argument("--cache-dir", help="Also print cache locations under this directory for the stubbed run")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.mode, args.fixtures, args.latency, args.throttle_every, args.port)
+    print(f"Stub server ({args.mode}) on {server.base_url}, fixtures in {args.fixtures}")
+    env = server.env()
+    if args.cache_dir:
+        env.update(isolated_cache_env(os.path.abspath(args.cache_dir)))
+    for name, value in env.items():
+        print(f"{name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
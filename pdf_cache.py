@@ -0,0 +1,102 @@
+"""
+Extracted PDF Text Cache
+Content-addressed on-disk cache so re-uploaded reports skip pypdf entirely
+"""
+
+import os
+import zlib
+import struct
+import threading
+from array import array
+from typing import List, Optional, Tuple
+
+from cache_store import cache_path
+
+PDF_CACHE_MAX_MB = float(os.getenv("PDF_CACHE_MAX_MB", "256"))
+
+# File layout: header | page start offsets (uint32 each) | zlib(UTF-8 text)
+_MAGIC = b"FAPC"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBI")  # magic, version, num_pages
+
+
+def page_offsets(pages: List[str]) -> List[int]:
+    """Character offset at which each page starts in "".join(pages)."""
+    offsets = []
+    pos = 0
+    for page_text in pages:
+        offsets.append(pos)
+        pos += len(page_text)
+    return offsets
+
+
+class PdfTextCache:
+    """Stores extracted text, page count and page offsets keyed by file hash, with LRU eviction"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_mb: float = PDF_CACHE_MAX_MB):
+        self.cache_dir = cache_dir or cache_path("PDF_CACHE_DIR", "pdf_text")
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.bin")
+
+    def get(self, key: str) -> Optional[Tuple[str, int, List[int]]]:
+        """Return (text, num_pages, page_offsets) for a file hash, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+            magic, version, num_pages = _HEADER.unpack_from(blob, 0)
+            if magic != _MAGIC or version != _VERSION:
+                return None
+            offsets_end = _HEADER.size + 4 * num_pages
+            offsets = array("I")
+            offsets.frombytes(blob[_HEADER.size:offsets_end])
+            text = zlib.decompress(blob[offsets_end:]).decode("utf-8")
+            # Mark as recently used for LRU eviction
+            os.utime(path, None)
+            return text, num_pages, offsets.tolist()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"PDF cache read failed for {key[:12]}: {e}")
+            return None
+
+    def put(self, key: str, text: str, offsets: List[int]) -> None:
+        """Store extracted text for a file hash and evict old entries past the size limit."""
+        try:
+            blob = (_HEADER.pack(_MAGIC, _VERSION, len(offsets))
+                    + array("I", offsets).tobytes()
+                    + zlib.compress(text.encode("utf-8"), 6))
+            path = self._path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+            self._evict()
+        except Exception as e:
+            print(f"PDF cache write failed for {key[:12]}: {e}")
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".bin"):
+                    continue
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+                total += stat.st_size
+
+            entries.sort()
+            for _, size, name in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    total -= size
+                except FileNotFoundError:
+                    pass
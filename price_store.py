@@ -0,0 +1,172 @@
+"""
+Daily Price Store
+Per-ticker columnar price history (dates + OHLCV) in append-only binary files,
+read back as memory-mapped NumPy arrays
+"""
+
+import os
+import re
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from cache_store import cache_path
+
+# How long a refreshed series is served without asking the API for newer days
+PRICE_REFRESH_SECONDS = float(os.getenv("PRICE_REFRESH_SECONDS", str(6 * 3600)))
+
+DATE_DTYPE = np.dtype("datetime64[D]")
+OHLCV_DTYPE = np.dtype("float64")
+OHLCV_FIELDS = ("1. open", "2. high", "3. low", "4. close", "5. volume")
+CLOSE = 3  # column index of the close in the OHLCV matrix
+
+# Trading days in a compact TIME_SERIES_DAILY response; longer gaps need the full series
+COMPACT_DAYS = 100
+
+_SYMBOL = re.compile(r"[A-Z0-9][A-Z0-9.\-]{0,19}")
+
+
+class PriceStore:
+    """dates.bin (datetime64[D]) and ohlcv.bin (float64 x 5) per ticker; refreshes rewrite the last
+    stored day (it may have been a partial intraday bar) and append the newer ones"""
+
+    def __init__(self, root: Optional[str] = None, refresh_seconds: float = PRICE_REFRESH_SECONDS):
+        self.root = root or cache_path("PRICE_STORE_DIR", "prices")
+        self.refresh_seconds = refresh_seconds
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _dir(self, ticker: str) -> str:
+        # Plain symbols only, so a ticker such as ".." cannot resolve outside the store
+        symbol = ticker.strip().upper()
+        if not _SYMBOL.fullmatch(symbol):
+            raise ValueError(f"Invalid ticker symbol: {ticker!r}")
+        return os.path.join(self.root, symbol)
+
+    def _lock(self, ticker: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(ticker.upper(), threading.Lock())
+
+    @staticmethod
+    def _stored_rows(directory: str) -> int:
+        dates_path = os.path.join(directory, "dates.bin")
+        ohlcv_path = os.path.join(directory, "ohlcv.bin")
+        if not os.path.exists(dates_path) or not os.path.exists(ohlcv_path):
+            return 0
+        # A crash between the two writes can leave one file longer; trust the common prefix
+        return min(os.path.getsize(dates_path) // DATE_DTYPE.itemsize,
+                   os.path.getsize(ohlcv_path) // (OHLCV_DTYPE.itemsize * len(OHLCV_FIELDS)))
+
+    def read(self, ticker: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Memory-mapped (dates, ohlcv) arrays, oldest first. Empty arrays if nothing is stored."""
+        directory = self._dir(ticker)
+        dates_path = os.path.join(directory, "dates.bin")
+        ohlcv_path = os.path.join(directory, "ohlcv.bin")
+        rows = self._stored_rows(directory)
+        if rows == 0:
+            return np.empty(0, DATE_DTYPE), np.empty((0, len(OHLCV_FIELDS)), OHLCV_DTYPE)
+        dates = np.memmap(dates_path, dtype=DATE_DTYPE, mode="r", shape=(rows,))
+        ohlcv = np.memmap(ohlcv_path, dtype=OHLCV_DTYPE, mode="r", shape=(rows, len(OHLCV_FIELDS)))
+        return dates, ohlcv
+
+    def last_date(self, ticker: str) -> Optional[np.datetime64]:
+        """Last stored date, read without mapping the files (see append_series)."""
+        directory = self._dir(ticker)
+        rows = self._stored_rows(directory)
+        if rows == 0:
+            return None
+        return np.fromfile(os.path.join(directory, "dates.bin"), dtype=DATE_DTYPE,
+                           count=1, offset=(rows - 1) * DATE_DTYPE.itemsize)[0]
+
+    def append_series(self, ticker: str, daily_series: Dict[str, Dict[str, str]]) -> int:
+        """Write the days of an Alpha Vantage "Time Series (Daily)" from the last stored date on:
+        the last stored row is overwritten, newer days are appended. Returns the rows written."""
+        with self._lock(ticker):
+            # No memmap is opened here: Windows refuses to resize a file while it is mapped
+            stored = self._stored_rows(self._dir(ticker))
+            last = self.last_date(ticker)
+
+            new_dates = sorted(d for d in daily_series if last is None or np.datetime64(d, "D") >= last)
+            if new_dates:
+                # Rows are written over the old last day in place and the files only grow, so
+                # memmaps held by readers (of the previous length) stay valid
+                keep = stored - 1 if last is not None and np.datetime64(new_dates[0], "D") == last else stored
+                rows = np.array([[float(daily_series[d].get(f, "nan")) for f in OHLCV_FIELDS] for d in new_dates],
+                                dtype=OHLCV_DTYPE)
+                directory = self._dir(ticker)
+                os.makedirs(directory, exist_ok=True)
+                self._write_rows(os.path.join(directory, "ohlcv.bin"), keep * rows[0].nbytes, rows.tobytes())
+                self._write_rows(os.path.join(directory, "dates.bin"), keep * DATE_DTYPE.itemsize,
+                                 np.array(new_dates, dtype=DATE_DTYPE).tobytes())
+
+            self._write_meta(ticker, {"refreshed": time.time()})
+            return len(new_dates)
+
+    @staticmethod
+    def _write_rows(path: str, offset: int, data: bytes) -> None:
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.seek(offset)
+            f.write(data)
+            if os.fstat(f.fileno()).st_size > offset + len(data):
+                # Rows past the common prefix left by a crash between the two writes. If a
+                # mapped file cannot shrink (Windows), read() still ignores the extra rows,
+                # as the other file ends at the same row
+                try:
+                    f.truncate()
+                except OSError as e:
+                    print(f"Could not trim {path}: {e}")
+
+    def _meta_path(self, ticker: str) -> str:
+        return os.path.join(self._dir(ticker), "meta.json")
+
+    def _write_meta(self, ticker: str, meta: Dict[str, Any]) -> None:
+        os.makedirs(self._dir(ticker), exist_ok=True)
+        with open(self._meta_path(ticker), "w") as f:
+            json.dump(meta, f)
+
+    def is_fresh(self, ticker: str) -> bool:
+        try:
+            with open(self._meta_path(ticker)) as f:
+                return time.time() - json.load(f).get("refreshed", 0) < self.refresh_seconds
+        except (FileNotFoundError, ValueError):
+            return False
+
+    def get(self, ticker: str, fetch: Callable[[bool], Dict[str, Any]]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        (dates, ohlcv) for a ticker. When the stored series is stale, `fetch(full)` is called
+        for a TIME_SERIES_DAILY response and only the days from the last stored one on are
+        written. `full` asks for the whole history (outputsize=full) when more trading days
+        have passed since the last stored date than a compact response covers.
+        Returns None if there is no data at all.
+        """
+        if not self.is_fresh(ticker):
+            last = self.last_date(ticker)
+            today = np.datetime64(time.strftime("%Y-%m-%d", time.gmtime()), "D")
+            full = last is not None and bool(np.busday_count(last, today) >= COMPACT_DAYS)
+            data = fetch(full)
+            daily_series = data.get("Time Series (Daily)", {}) if isinstance(data, dict) else {}
+            if daily_series:
+                added = self.append_series(ticker, daily_series)
+                print(f"DEBUG: Price store wrote {added} day(s) for {ticker}")
+
+        dates, ohlcv = self.read(ticker)
+        if not len(dates):
+            return None
+        return dates, ohlcv
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceStore:
+    """Process-wide price store."""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = PriceStore()
+        return _shared_store
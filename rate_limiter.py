@@ -0,0 +1,95 @@
+"""
+Rate Limiting
+Thread-safe token buckets for outbound API budgets (calls per minute and per day)
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Optional
+
+# Free tier defaults; raise these for premium keys
+ALPHA_VANTAGE_CALLS_PER_MINUTE = float(os.getenv("ALPHA_VANTAGE_CALLS_PER_MINUTE", "5"))
+ALPHA_VANTAGE_CALLS_PER_DAY = float(os.getenv("ALPHA_VANTAGE_CALLS_PER_DAY", "25"))
+
+# Longest a caller will block for a token before the call is treated as rate limited
+ALPHA_VANTAGE_MAX_WAIT = float(os.getenv("ALPHA_VANTAGE_MAX_WAIT", "30"))
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` tokens, refilled continuously at `rate` per second.
+    Not locked itself; RateLimiter serialises access."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available (0 if available now)."""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class RateLimiter:
+    """Per-minute and per-day budgets shared by every caller of one API.
+    Calls only wait when a bucket is actually empty."""
+
+    def __init__(self, per_minute: float, per_day: Optional[float] = None, max_wait: float = ALPHA_VANTAGE_MAX_WAIT):
+        self.max_wait = max_wait
+        self._buckets = [TokenBucket(per_minute, per_minute / 60.0)]
+        if per_day:
+            self._buckets.append(TokenBucket(per_day, per_day / 86400.0))
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.total_wait = 0.0
+
+    def acquire(self, max_wait: Optional[float] = None) -> bool:
+        """Take one token from every bucket, sleeping while any is empty.
+
+        Returns False (without consuming) if the wait would exceed `max_wait`,
+        e.g. when the daily budget is exhausted.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                for bucket in self._buckets:
+                    bucket.refill(now)
+                wait = max(bucket.wait_time() for bucket in self._buckets)
+                if wait == 0:
+                    for bucket in self._buckets:
+                        bucket.tokens -= 1
+                    self.calls += 1
+                    return True
+                if now + wait > deadline:
+                    return False
+                self.total_wait += wait
+            time.sleep(wait)
+
+    def status(self) -> Dict[str, float]:
+        """Current tokens per bucket and the wait a call made now would incur."""
+        with self._lock:
+            now = time.monotonic()
+            for bucket in self._buckets:
+                bucket.refill(now)
+            status = {
+                "tokens_minute": round(self._buckets[0].tokens, 2),
+                "wait_seconds": round(max(bucket.wait_time() for bucket in self._buckets), 2),
+                "calls": self.calls,
+                "total_wait_seconds": round(self.total_wait, 2),
+            }
+            if len(self._buckets) > 1:
+                status["tokens_day"] = round(self._buckets[1].tokens, 2)
+            return status
+
+
+# Shared by every agent in the process
+alpha_vantage_limiter = RateLimiter(ALPHA_VANTAGE_CALLS_PER_MINUTE, ALPHA_VANTAGE_CALLS_PER_DAY)
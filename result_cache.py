@@ -0,0 +1,104 @@
+"""
+Stale-While-Revalidate Result Cache
+Keeps finished analysis results so dashboards can be served instantly: fresh
+entries are returned as is, expired ones within a grace window are returned
+immediately while a single background refresh recomputes them
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from cache_store import MemoryLRUCache
+from single_flight import SingleFlight
+
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+RESULT_CACHE_GRACE = float(os.getenv("RESULT_CACHE_GRACE_SECONDS", "1800"))
+
+
+class StaleWhileRevalidateCache:
+    """In-memory results, fresh for `ttl` seconds and servable stale for `grace` more"""
+
+    def __init__(self, ttl: float = RESULT_CACHE_TTL, grace: float = RESULT_CACHE_GRACE,
+                 max_entries: int = 256, refresh_workers: int = 2):
+        self.ttl = ttl
+        self.grace = grace
+        self._entries = MemoryLRUCache(max_entries)  # key -> (value, computed_at), dropped after ttl + grace
+        self._flights = SingleFlight()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="result-refresh")
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.counters = {"fresh": 0, "stale": 0, "miss": 0, "refreshes": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _compute(self, key: str, compute: Callable[[], Any], cacheable: Callable[[Any], bool]) -> Any:
+        value = compute()
+        if value is not None and cacheable(value):
+            self._entries.set(key, (value, time.time()), ttl=self.ttl + self.grace)
+        return value
+
+    def _refresh(self, key: str, compute: Callable[[], Any], cacheable: Callable[[Any], bool]) -> None:
+        try:
+            self._flights.do(key, lambda: self._compute(key, compute, cacheable))
+        except Exception as e:
+            # The stale entry keeps being served until the grace window ends
+            print(f"Background refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get(self, key: str, compute: Callable[[], Any],
+            cacheable: Callable[[Any], bool] = lambda value: True) -> Optional[Dict[str, Any]]:
+        """
+        Return {"value", "as_of", "stale"} for a key, or None if compute() returned None.
+
+        Misses compute synchronously (concurrent misses share one computation).
+        Stale hits return at once and start a background refresh unless one is
+        already running. Results rejected by `cacheable` are returned but not kept.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._count("miss")
+            value = self._flights.do(key, lambda: self._compute(key, compute, cacheable))
+            return None if value is None else {"value": value, "as_of": time.time(), "stale": False}
+
+        value, computed_at = entry
+        stale = time.time() - computed_at >= self.ttl
+        if stale:
+            self._count("stale")
+            with self._lock:
+                start_refresh = key not in self._refreshing
+                self._refreshing.add(key)
+            if start_refresh:
+                self._count("refreshes")
+                self._refresher.submit(self._refresh, key, compute, cacheable)
+        else:
+            self._count("fresh")
+        return {"value": value, "as_of": computed_at, "stale": stale}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counters, "entries": self._entries.stats()["entries"]}
+
+
+def as_of_iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds")
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> StaleWhileRevalidateCache:
+    """Process-wide cache for analyze_stock / extract_metrics results."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = StaleWhileRevalidateCache()
+        return _shared_cache
@@ -0,0 +1,100 @@
+"""
+Passage Retrieval
+In-memory BM25 index over the uploaded document so chat turns can pull the
+passages relevant to each question instead of a fixed prefix
+"""
+
+import re
+import math
+import heapq
+from collections import Counter, defaultdict
+from typing import List, Tuple
+
+PASSAGE_CHARS = 800
+PASSAGE_OVERLAP = 100
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "what which who will with how does do did their our we you your about".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/number tokens without stopwords."""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def chunk_text(text: str, size: int = PASSAGE_CHARS, overlap: int = PASSAGE_OVERLAP) -> List[Tuple[int, str]]:
+    """Split text into overlapping passages, cut at whitespace. Returns (offset, passage) pairs."""
+    passages = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + size)
+        if end < len(text):
+            space = text.rfind(" ", start + size // 2, end)
+            if space != -1:
+                end = space
+        passages.append((start, text[start:end]))
+        if end >= len(text):
+            break
+        start = max(start + 1, end - overlap)
+    return passages
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of passages, built once and queried per turn"""
+
+    def __init__(self, passages: List[str], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+
+        self._postings = defaultdict(list)  # term -> [(passage_id, term_frequency)]
+        self._lengths = []
+        for pid, passage in enumerate(passages):
+            counts = Counter(tokenize(passage))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings[term].append((pid, tf))
+
+        n = len(passages)
+        self._avg_length = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """Return up to k (passage_id, score) pairs, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for pid, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[pid] / (self._avg_length or 1))
+                scores[pid] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+class DocumentRetriever:
+    """Chunks a document and retrieves the passages most relevant to a query under a character budget"""
+
+    def __init__(self, text: str):
+        chunks = chunk_text(text)
+        self._offsets = [offset for offset, _ in chunks]
+        self.index = BM25Index([passage for _, passage in chunks])
+
+    def retrieve(self, query: str, budget: int, k: int = 8) -> str:
+        """Concatenate the top passages (in document order) up to `budget` characters; '' if nothing matches."""
+        selected = []
+        used = 0
+        for pid, _ in self.index.search(query, k):
+            passage = self.index.passages[pid]
+            if used + len(passage) + 5 > budget:
+                continue
+            selected.append(pid)
+            used += len(passage) + 5
+        selected.sort(key=lambda pid: self._offsets[pid])
+        return "\n...\n".join(self.index.passages[pid] for pid in selected)
@@ -0,0 +1,122 @@
+"""
+Sentiment History
+Per-ticker daily sentiment aggregates in a local SQLite file, updated
+incrementally with only the articles not counted before
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+from cache_store import cache_path
+
+# Counted article URLs are remembered this long (covers the longest trend window);
+# older articles are not added to the history at all
+SENTIMENT_SEEN_DAYS = int(os.getenv("SENTIMENT_SEEN_DAYS", "100"))
+
+
+class SentimentHistory:
+    """Daily (sum, count, weighted_sum, weight) of article compound scores per ticker.
+    The weight is the score's magnitude, so weighted_sum / weight favours strongly worded coverage.
+    Each article is counted once per ticker, however late it shows up or whichever query returned it."""
+
+    def __init__(self, path: Optional[str] = None, seen_days: int = SENTIMENT_SEEN_DAYS):
+        self.path = path = path or cache_path("SENTIMENT_HISTORY_PATH", "sentiment_history.sqlite")
+        self.seen_days = seen_days
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS daily ("
+            " ticker TEXT NOT NULL, day TEXT NOT NULL, sum REAL NOT NULL, count INTEGER NOT NULL,"
+            " weighted_sum REAL NOT NULL, weight REAL NOT NULL, PRIMARY KEY (ticker, day))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " ticker TEXT NOT NULL, article TEXT NOT NULL, published_at TEXT NOT NULL, PRIMARY KEY (ticker, article))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_published ON seen(published_at)")
+        # Superseded publishedAt high-water marks
+        self._conn.execute("DROP TABLE IF EXISTS cursor")
+        self._conn.commit()
+
+    @staticmethod
+    def _article_id(article: Dict) -> str:
+        return article.get("url") or f"{article.get('publishedAt')}|{article.get('title')}"
+
+    def record(self, ticker: str, articles: Sequence[Dict], scores: Sequence[float]) -> int:
+        """Add the articles not yet counted for the ticker; returns how many were added."""
+        ticker = ticker.upper()
+        # ISO-8601 UTC timestamps compare correctly as strings
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self.seen_days)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        added = 0
+        with self._lock:
+            for article, score in zip(articles, scores):
+                published = article.get("publishedAt") or ""
+                if len(published) < 10 or published < cutoff:
+                    continue
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO seen (ticker, article, published_at) VALUES (?, ?, ?)",
+                    (ticker, self._article_id(article), published),
+                ).rowcount
+                if not inserted:
+                    continue
+                added += 1
+                self._conn.execute(
+                    "INSERT INTO daily (ticker, day, sum, count, weighted_sum, weight) VALUES (?, ?, ?, 1, ?, ?)"
+                    " ON CONFLICT(ticker, day) DO UPDATE SET sum = sum + excluded.sum, count = count + 1,"
+                    " weighted_sum = weighted_sum + excluded.weighted_sum, weight = weight + excluded.weight",
+                    (ticker, published[:10], score, score * abs(score), abs(score)),
+                )
+            self._conn.execute("DELETE FROM seen WHERE published_at < ?", (cutoff,))
+            self._conn.commit()
+        return added
+
+    def daily(self, ticker: str, days: int, today: Optional[date] = None) -> List[Dict]:
+        """Stored aggregates for the last `days` days (oldest first); days without articles are omitted."""
+        today = today or datetime.now(timezone.utc).date()
+        start = today - timedelta(days=days - 1)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, sum, count, weighted_sum, weight FROM daily"
+                " WHERE ticker = ? AND day BETWEEN ? AND ? ORDER BY day",
+                (ticker.upper(), str(start), str(today)),
+            ).fetchall()
+        return [{"day": r[0], "sum": r[1], "count": r[2], "weighted_sum": r[3], "weight": r[4]} for r in rows]
+
+    def trend(self, ticker: str, days: int = 7, today: Optional[date] = None) -> List[float]:
+        """Daily mean score for the last `days` days, oldest first.
+        Days without articles repeat the previous day's mean (the last stored one before the window, else 0)."""
+        today = today or datetime.now(timezone.utc).date()
+        start = today - timedelta(days=days - 1)
+        with self._lock:
+            before = self._conn.execute(
+                "SELECT sum, count FROM daily WHERE ticker = ? AND day < ? ORDER BY day DESC LIMIT 1",
+                (ticker.upper(), str(start)),
+            ).fetchone()
+        means = {row["day"]: row["sum"] / row["count"] for row in self.daily(ticker, days, today)}
+
+        trend = []
+        last = before[0] / before[1] if before else 0.0
+        for offset in range(days):
+            last = means.get(str(start + timedelta(days=offset)), last)
+            trend.append(round(last, 2))
+        return trend
+
+
+_shared_history = None
+_shared_history_lock = threading.Lock()
+
+
+def get_sentiment_history() -> SentimentHistory:
+    """Process-wide sentiment history store."""
+    global _shared_history
+    with _shared_history_lock:
+        if _shared_history is None:
+            _shared_history = SentimentHistory()
+        return _shared_history
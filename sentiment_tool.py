@@ -1,25 +1,306 @@
 import os
-import requests
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+import re
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cache_store import MemoryLRUCache, cache_path
+from http_client import RETRYABLE_STATUS, default_http_client
+from sentiment_history import get_sentiment_history
+from single_flight import SingleFlight
+from symbol_directory import CORPORATE_SUFFIXES
 
-# Ensure VADER lexicon is downloaded
-try:
-    nltk.data.find('sentiment/vader_lexicon.zip')
-except LookupError:
-    nltk.download('vader_lexicon', quiet=True)
+# Parsed VADER lexicon (word -> valence) written on first load; later processes
+# read it instead of locating and re-parsing NLTK's zipped lexicon. The NLTK version
+# is appended to the file name (VADER_LEXICON_JSON), so an upgrade re-parses its own lexicon.
+
+_vader = None
+_vader_lock = threading.Lock()
+
+
+def _lexicon_json_path(nltk_version):
+    root, ext = os.path.splitext(cache_path("VADER_LEXICON_JSON", "vader_lexicon.json"))
+    return f"{root}-{nltk_version}{ext or '.json'}"
+
+
+def _analyzer_from_json(path):
+    """Analyzer built around a saved lexicon without running the constructor (which parses
+    the zipped lexicon). None if the file is missing, or this NLTK's analyzer needs
+    attributes the shortcut does not set."""
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            lexicon = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    analyzer.lexicon = lexicon
+    analyzer.constants = VaderConstants()
+    try:
+        analyzer.polarity_scores("The results were not bad at all!")["compound"]
+    except (AttributeError, KeyError, TypeError) as e:
+        print(f"Saved VADER lexicon does not fit this NLTK version ({e}); loading it from NLTK")
+        return None
+    return analyzer
+
+
+def _load_vader():
+    # NLTK is imported here, not at module import, so server startup does not pay for it
+    import nltk
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+    path = _lexicon_json_path(nltk.__version__)
+    analyzer = _analyzer_from_json(path)
+    if analyzer is not None:
+        return analyzer
+
+    # Ensure VADER lexicon is downloaded
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+    except LookupError:
+        nltk.download('vader_lexicon', quiet=True)
+    analyzer = SentimentIntensityAnalyzer()
+
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(analyzer.lexicon, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Could not save VADER lexicon: {e}")
+    return analyzer
+
+
+def get_vader():
+    """Process-wide VADER analyzer, loaded on first use. Scoring only reads it, so it is shared across threads."""
+    global _vader
+    with _vader_lock:
+        if _vader is None:
+            _vader = _load_vader()
+        return _vader
+
+
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+
+# Concurrent fetches of the same NewsAPI query share one request
+news_flights = SingleFlight()
+
+# Articles per (endpoint, query string); empty results are kept too so thin-coverage
+# strategies are not re-asked on every refresh
+NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL_SECONDS", "900"))
+news_cache = MemoryLRUCache(max_entries=512)
+
+# Compound score per article (URL + hash of the scored text); a score never goes stale,
+# so refreshes of the same ticker only score articles they have not seen
+score_cache = MemoryLRUCache(max_entries=5000)
+
+# Runs the fallback strategies of fetch_news side by side (sized to the newsapi.org pool)
+news_pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix="newsapi")
+
+# Strategies fetch_news keeps in flight at once; 0 (default) requests all of them together.
+# Deployments short on NewsAPI quota can set 1 to ask for a fallback only after the
+# previous strategy came back empty, at the cost of one request time per fallback
+NEWS_CONCURRENT_STRATEGIES = int(os.getenv("NEWS_CONCURRENT_STRATEGIES", "0"))
+
+# NewsAPI's 429 means the quota is spent; retrying only spends more of it
+NEWS_RETRYABLE_STATUS = RETRYABLE_STATUS - {429}
+
+# Each NewsAPI request is tried this many extra times, so a strategy takes at most
+# (1 + NEWS_MAX_RETRIES) timeouts rather than the shared client's retry budget
+NEWS_TIMEOUT = float(os.getenv("NEWS_TIMEOUT", "5"))
+NEWS_MAX_RETRIES = int(os.getenv("NEWS_MAX_RETRIES", "0"))
+
+# NewsAPI caps `q` at 500 characters and pageSize at 100
+NEWS_QUERY_MAX_CHARS = 500
+BATCH_PAGE_SIZE = 100
+# A combined query gets one page, so it covers at most this many tickers to leave
+# each roughly the 20 articles a per-ticker query returns
+BATCH_ARTICLES_PER_TICKER = 20
+BATCH_TICKERS_PER_QUERY = BATCH_PAGE_SIZE // BATCH_ARTICLES_PER_TICKER
+
+# NewsAPI matches words case-insensitively, so symbols are only searched next to market words
+NEWS_SYMBOL_CONTEXT = "(stock OR market OR finance)"
+
+
+# Words that identify nothing on their own; a one-word news keyword must not be one of them
+_KEYWORD_STOPWORDS = frozenset(
+    "a an and at by for in of on or the to with new general american united national international "
+    "global first bank group financial capital energy".split()
+)
+# Everyday words that are also one-word company names; these match only as the full name ("target corporation")
+_GENERIC_NAME_WORDS = frozenset(
+    "target gap block square visa snap progress post news fox ball align booking match discovery "
+    "shift edge signal trade market stock share price".split()
+)
+# Symbols that are everyday words; like single letters, only "$ON" style mentions count
+_WORD_SYMBOLS = frozenset(
+    "A AN AT BE DO GO IT ON SO UP ALL ANY ARE BIG CAN CAR CAT EAT FUN HAS KEY LOW NEW NOW ONE SEE "
+    "CASH FAST GOOD HOME LIFE LOVE MAIN MOST OPEN PLAY REAL SAFE TEAM TRUE WELL WORK".split()
+)
+# Trailing descriptors dropped for a short keyword ("Meta Platforms" is also "Meta")
+_NAME_DESCRIPTORS = frozenset(
+    "platforms technologies technology systems motors pharmaceuticals communications networks software "
+    "entertainment brands foods airlines therapeutics laboratories labs industries enterprises solutions "
+    "services resources semiconductor semiconductors devices".split()
+)
+# Words keep "&" between letters ("at&t"); a free-standing "&" joins words ("johnson & johnson")
+_KEYWORD_TOKEN = re.compile(r"[a-z0-9]+(?:[&'][a-z0-9]+)*|&")
+# Punctuation allowed between the words of a keyword in article text
+_KEYWORD_SEPARATOR = r"[\s.,&'-]+"
+
+
+def _keyword_words(text):
+    return [t for t in _KEYWORD_TOKEN.findall(text.lower()) if t != "&"]
+
+
+def _trim_ampersands(tokens):
+    while tokens and tokens[-1] == "&":
+        tokens.pop()
+    while tokens and tokens[0] == "&":
+        tokens.pop(0)
+    return tokens
+
+
+def news_keywords(company_name):
+    """
+    Phrases that identify a company in news text: the name without corporate
+    suffixes, plus a short form without trailing descriptors. One-word keywords
+    that are stopwords or shorter than 3 characters are rejected; everyday words
+    ("target") are replaced by the full name.
+
+    news_keywords("AT&T Inc") -> ["at&t"]
+    news_keywords("Johnson & Johnson") -> ["johnson & johnson"]
+    news_keywords("Meta Platforms, Inc.") -> ["meta platforms", "meta"]
+    news_keywords("Target Corporation") -> ["target corporation"]
+    """
+    full = _trim_ampersands(_KEYWORD_TOKEN.findall((company_name or "").lower()))
+    tokens = _trim_ampersands([t for t in full if t not in CORPORATE_SUFFIXES])
+
+    candidates = [tokens]
+    short = list(tokens)
+    while len(short) > 1 and short[-1] in _NAME_DESCRIPTORS:
+        short.pop()
+    if short != tokens and short[-1] != "&":
+        candidates.append(short)
+
+    keywords = []
+    for words in candidates:
+        if len(words) == 1 and (len(words[0]) < 3 or words[0] in _KEYWORD_STOPWORDS):
+            continue
+        if len(words) == 1 and words[0] in _GENERIC_NAME_WORDS:
+            if len(full) == 1:
+                continue
+            words = full
+        if words:
+            keywords.append(" ".join(words))
+    return list(dict.fromkeys(keywords))
+
+
+def _is_word_symbol(ticker):
+    return len(ticker) == 1 or ticker in _WORD_SYMBOLS
+
+
+class TickerMatcher:
+    """Routes article text to the watchlist tickers it mentions, via two precompiled
+    alternations: symbols (case-sensitive) and company news keywords (case-insensitive)"""
+
+    def __init__(self, watchlist):
+        self._by_term = {}
+        symbols, names = [], []
+        for ticker, company_name in watchlist.items():
+            # Single-letter and everyday-word symbols collide with ordinary words; only "$F" style mentions count
+            symbols.append((r"\$" if _is_word_symbol(ticker) else r"\$?") + re.escape(ticker))
+            self._by_term.setdefault(ticker, set()).add(ticker)
+            self._by_term.setdefault("$" + ticker, set()).add(ticker)
+            for keyword in news_keywords(company_name):
+                names.append(_KEYWORD_SEPARATOR.join(map(re.escape, _keyword_words(keyword))))
+                self._by_term.setdefault(" ".join(_keyword_words(keyword)), set()).add(ticker)
+
+        longest_first = lambda terms: sorted(set(terms), key=len, reverse=True)
+        self._symbols = re.compile(r"(?<![\w$])(" + "|".join(longest_first(symbols)) + r")\b") if symbols else None
+        self._names = re.compile(r"\b(" + "|".join(longest_first(names)) + r")\b", re.IGNORECASE) if names else None
+
+    def match(self, text):
+        tickers = set()
+        if self._symbols:
+            for term in self._symbols.findall(text):
+                tickers |= self._by_term.get(term, set())
+        if self._names:
+            for term in self._names.findall(text):
+                tickers |= self._by_term.get(" ".join(_keyword_words(term)), set())
+        return tickers
+
+
+def _batch_query(watchlist):
+    """One NewsAPI query for a few tickers: the symbols qualified by market words, OR each news keyword.
+    Symbols of one or two letters or everyday words are searched as "$T" only."""
+    symbols, keywords = [], []
+    for ticker, company_name in watchlist:
+        symbols.append(f'"${ticker}"' if len(ticker) <= 2 or _is_word_symbol(ticker) else ticker)
+        keywords.extend(f'"{keyword}"' for keyword in news_keywords(company_name))
+    return " OR ".join([f"(({' OR '.join(symbols)}) AND {NEWS_SYMBOL_CONTEXT})"] + list(dict.fromkeys(keywords)))
+
+
+def batch_queries(watchlist, max_chars=NEWS_QUERY_MAX_CHARS, tickers_per_query=BATCH_TICKERS_PER_QUERY):
+    """Combined queries covering every ticker, each within max_chars and tickers_per_query."""
+    queries, group = [], []
+    for item in watchlist.items():
+        if group and (len(group) >= tickers_per_query or len(_batch_query(group + [item])) > max_chars):
+            queries.append(_batch_query(group))
+            group = []
+        group.append(item)
+    if group:
+        queries.append(_batch_query(group))
+    return queries
 
 class SentimentAnalyzer:
-    def __init__(self, news_api_key=None):
+    def __init__(self, news_api_key=None, news_api_url=None, http_client=None):
         self.news_api_key = news_api_key or "207bb07d51b242988157a15f97c6f262" # Default from provided code
-        self.analyzer = SentimentIntensityAnalyzer()
+        self.news_api_url = news_api_url or os.getenv("NEWS_API_URL", NEWS_API_URL)
+        self.http = http_client or default_http_client
+        self.history = get_sentiment_history()
+        self._analyzer = None  # per-instance override of the shared VADER analyzer
 
-    def fetch_news(self, ticker, company_name=None):
-        """Fetch recent news for a ticker from NewsAPI using fallback strategies."""
-        url = "https://newsapi.org/v2/everything"
-        
+    @property
+    def analyzer(self):
+        return self._analyzer or get_vader()
+
+    @analyzer.setter
+    def analyzer(self, analyzer):
+        self._analyzer = analyzer
+
+    def _query_news(self, query, page_size=20):
+        """Articles for one NewsAPI query, from the per-query cache when fresh."""
+        url = self.news_api_url
+        key = (url, query, page_size)
+        cached = news_cache.get(key)
+        if cached is not None:
+            return cached
+
+        params = {
+            "q": query,
+            "language": "en",
+            "sortBy": "publishedAt",
+            "pageSize": page_size,
+            "apiKey": self.news_api_key
+        }
+        data = news_flights.do(key, lambda: self.http.get_json(url, params=params, timeout=NEWS_TIMEOUT,
+                                                               retry_status=NEWS_RETRYABLE_STATUS,
+                                                               max_retries=NEWS_MAX_RETRIES))
+        articles = data.get("articles", [])
+        # Error bodies (rate limited, bad key) are not cached
+        if data.get("status") == "ok":
+            news_cache.set(key, articles, ttl=NEWS_CACHE_TTL)
+        return articles
+
+    @staticmethod
+    def news_queries(ticker, company_name=None):
+        """fetch_news fallback strategies for a ticker, in priority order."""
         # Strategy 1: Ticker + Keywords (Most relevant)
-        queries = [f"{ticker} AND (stock OR market OR finance)"]
+        queries = [f"{ticker} AND {NEWS_SYMBOL_CONTEXT}"]
         
         # Strategy 2: Company Name (if provided)
         if company_name and company_name != "Unknown":
@@ -27,82 +308,151 @@ class SentimentAnalyzer:
             
         # Strategy 3: Ticker only (Broadest)
         queries.append(ticker)
-        
-        for query in queries:
-            params = {
-                "q": query,
-                "language": "en",
-                "sortBy": "publishedAt",
-                "pageSize": 20,
-                "apiKey": self.news_api_key
-            }
-            
-            try:
-                response = requests.get(url, params=params, timeout=5)
-                data = response.json()
-                articles = data.get("articles", [])
-                
+        return list(dict.fromkeys(queries))
+
+    def news_calls(self, ticker, company_name=None):
+        """Most NewsAPI requests fetch_news can make for a ticker given what is cached."""
+        return sum(not news_cache.contains((self.news_api_url, query, 20))
+                   for query in self.news_queries(ticker, company_name))
+
+    def fetch_news(self, ticker, company_name=None):
+        """Fetch recent news for a ticker from NewsAPI using fallback strategies.
+
+        All strategies are requested concurrently (or up to NEWS_CONCURRENT_STRATEGIES
+        at once); the first non-empty result in priority order wins, so the worst case
+        is one request time instead of three.
+        """
+        queries = self.news_queries(ticker, company_name)
+        width = NEWS_CONCURRENT_STRATEGIES if NEWS_CONCURRENT_STRATEGIES > 0 else len(queries)
+
+        futures = []
+        try:
+            for i, query in enumerate(queries):
+                # Keep this strategy and the next fallbacks (up to the cap) requested
+                while len(futures) < min(len(queries), i + width):
+                    futures.append(news_pool.submit(self._query_news, queries[len(futures)]))
+                try:
+                    articles = futures[i].result()
+                except Exception as e:
+                    print(f"Error fetching news for '{query}': {e}")
+                    continue
+
                 if articles:
                     print(f"DEBUG: Found {len(articles)} articles using query: '{query}'")
                     return articles
-                
+
                 print(f"DEBUG: No news for '{query}', trying next strategy...")
-                
-            except Exception as e:
-                print(f"Error fetching news for '{query}': {e}")
-                
+        finally:
+            # Lower-priority requests already in flight finish in the background and fill the cache
+            for future in futures:
+                future.cancel()
+
         return []
 
     def analyze_sentiment(self, text):
         """Get compound sentiment score for text."""
-        if not text: return 0.0
-        return self.analyzer.polarity_scores(text)["compound"]
+        return self.score_texts([text])[0]
+
+    def score_texts(self, texts):
+        """Compound scores for a list of texts; repeated texts are scored once."""
+        unique = {text: None for text in texts if text}
+        for text in unique:
+            unique[text] = self.analyzer.polarity_scores(text)["compound"]
+        return [unique[text] if text else 0.0 for text in texts]
+
+    @staticmethod
+    def article_text(article):
+        return f"{article.get('title', '')}. {article.get('description', '') or ''}"
 
-    def get_stock_sentiment(self, ticker, company_name=None):
+    def score_articles(self, articles):
+        """Compound score per article, from the score cache where the article was seen before."""
+        texts = [self.article_text(article) for article in articles]
+        if self._analyzer is not None:
+            # The shared score cache holds scores from the shared analyzer only
+            return self.score_texts(texts)
+        keys = [f"{article.get('url', '')}|{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+                for article, text in zip(articles, texts)]
+        scores = [score_cache.get(key) for key in keys]
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            for i, score in zip(missing, self.score_texts([texts[i] for i in missing])):
+                scores[i] = score
+                score_cache.set(keys[i], score)
+        return scores
+
+    def get_stock_sentiment(self, ticker, company_name=None, trend_days=7):
         """
         Analyze sentiment for a stock ticker.
-        Returns dict with score, label, top articles, and 7-day trend.
+        Returns dict with score, label, top articles, and a daily trend
+        (`trend_days` long, e.g. 7, 30 or 90) from the persistent sentiment history.
         """
         articles = self.fetch_news(ticker, company_name)
-        
-        from datetime import datetime, timedelta, timezone
-        
-        # Initialize 7-day trend (Today down to D-6)
-        today = datetime.now(timezone.utc).date()
-        date_labels = [(today - timedelta(days=i)) for i in range(7)]
-        date_labels.reverse() # Oldest to newest: [D-6, ..., Today]
-        
-        daily_scores = {str(d): [] for d in date_labels}
-        
+        return self._summarize(ticker, articles, self.score_articles(articles), trend_days)
+
+    def get_batch_sentiment(self, watchlist, trend_days=7):
+        """
+        Sentiment for many tickers from a few combined NewsAPI queries.
+
+        `watchlist` maps ticker -> company name (or None), or is a list of tickers.
+        Every returned article is scored once and routed to each ticker it mentions.
+        Returns {ticker: get_stock_sentiment-shaped dict}.
+        """
+        if not isinstance(watchlist, dict):
+            watchlist = dict.fromkeys(watchlist)
+        watchlist = {t.strip().upper(): name for t, name in watchlist.items() if t and t.strip()}
+        if not watchlist:
+            return {}
+
+        queries = batch_queries(watchlist)
+        futures = [news_pool.submit(self._query_news, query, BATCH_PAGE_SIZE) for query in queries]
+        articles = {}
+        for query, future in zip(queries, futures):
+            try:
+                for article in future.result():
+                    articles.setdefault(article.get("url") or id(article), article)
+            except Exception as e:
+                print(f"Error fetching news for '{query}': {e}")
+        print(f"DEBUG: {len(queries)} batch queries returned {len(articles)} articles for {len(watchlist)} tickers")
+
+        # Newest first, like the per-ticker queries
+        articles = sorted(articles.values(), key=lambda a: a.get("publishedAt") or "", reverse=True)
+        scores = self.score_articles(articles)
+
+        matcher = TickerMatcher(watchlist)
+        routed = {ticker: ([], []) for ticker in watchlist}
+        for article, score in zip(articles, scores):
+            for ticker in matcher.match(self.article_text(article)):
+                ticker_articles, ticker_scores = routed[ticker]
+                if len(ticker_articles) < BATCH_ARTICLES_PER_TICKER:
+                    ticker_articles.append(article)
+                    ticker_scores.append(score)
+
+        return {ticker: self._summarize(ticker, a, s, trend_days) for ticker, (a, s) in routed.items()}
+
+    def _summarize(self, ticker, articles, scores, trend_days=7):
+        """Score, label, article list and trend for one ticker's scored articles (newest first)."""
         if not articles:
             return {
                 "sentiment_score": 0.0,
                 "sentiment_label": "Neutral",
                 "news": [],
-                "sentiment_trend": [0.0] * 7
+                "sentiment_trend": self.history.trend(ticker, trend_days)
             }
 
         scored_articles = []
         weighted_sum = 0.0
         total_weight = 0.0
+
+        # Only articles newer than the last update are added to the daily aggregates
+        added = self.history.record(ticker, articles, scores)
+        if added:
+            print(f"DEBUG: Added {added} new articles to the {ticker} sentiment history")
         
-        # Analyze each article
-        for i, article in enumerate(articles):
+        # Aggregate each article
+        for i, (article, score) in enumerate(zip(articles, scores)):
             title = article.get("title", "")
-            description = article.get("description", "") or ""
-            text_to_analyze = f"{title}. {description}"
             published_at = article.get("publishedAt", "")
-            
-            score = self.analyze_sentiment(text_to_analyze)
-            
-            # Map to trend dates
-            try:
-                pub_date = datetime.strptime(published_at[:10], "%Y-%m-%d").date()
-                date_str = str(pub_date)
-                if date_str in daily_scores:
-                    daily_scores[date_str].append(score)
-            except:
-                pass
 
             # Weight recent articles higher for the "current" score
             weight = len(articles) - i
@@ -119,19 +469,6 @@ class SentimentAnalyzer:
 
         # Calculate final aggregated score
         final_score = weighted_sum / total_weight if total_weight > 0 else 0.0
-        
-        # Construct trend array
-        trend = []
-        last_valid_score = 0.0
-        for d in date_labels:
-            scores = daily_scores.get(str(d), [])
-            if scores:
-                day_avg = sum(scores) / len(scores)
-                trend.append(round(day_avg, 2))
-                last_valid_score = day_avg
-            else:
-                # Fill gaps with last known score or 0
-                trend.append(round(last_valid_score, 2))
 
         # Determine Label
         if final_score >= 0.05:
@@ -145,7 +482,7 @@ class SentimentAnalyzer:
             "sentiment_score": round(final_score, 2),
             "sentiment_label": label,
             "news": scored_articles[:20], # Return top 20 for display
-            "sentiment_trend": trend
+            "sentiment_trend": self.history.trend(ticker, trend_days)
         }
 
 
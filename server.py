@@ -1,18 +1,24 @@
 import os
-import shutil
+import json
+import hashlib
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
 # Import existing agent logic
 # Ensure these files are in the same directory or PYTHONPATH
-from agent import FinancialAnalystAgent
-from pdf_processor import extract_text_from_pdf
+from agent import FinancialAnalystAgent, METADATA_CONTEXT_CHARS
+from pdf_processor import iter_pdf_pages
+from pdf_cache import PdfTextCache, page_offsets
 from report_generator import generate_pdf
+from batch_scheduler import BatchScheduler
+from rate_limiter import alpha_vantage_limiter
+from http_client import default_http_client
+from concurrent.futures import ThreadPoolExecutor
 import uuid
 
 load_dotenv()
@@ -41,6 +47,7 @@ class AgentState:
     agent: Optional[FinancialAnalystAgent] = None
 
 state = AgentState()
+pdf_cache = PdfTextCache()
 
 class InitRequest(BaseModel):
     groq_api_key: str
@@ -52,6 +59,14 @@ class ChatRequest(BaseModel):
 class AnalyzeRequest(BaseModel):
     ticker: str
 
+class BatchAnalyzeRequest(BaseModel):
+    tickers: List[str]
+
+class BatchSentimentRequest(BaseModel):
+    tickers: List[str]
+    company_names: Dict[str, str] = {}
+    trend_days: int = Field(7, ge=1, le=365)
+
 @app.post("/api/init")
 async def init_agent(request: InitRequest):
     try:
@@ -72,29 +87,57 @@ async def upload_pdf(file: UploadFile = File(...)):
     if not state.agent:
         raise HTTPException(status_code=400, detail="Agent not initialized. Please set API keys first.")
     
+    temp_file_path = f"temp_{file.filename}"
     try:
-        # Save temp file
-        temp_file_path = f"temp_{file.filename}"
+        # Save temp file, hashing the bytes as they are written
+        digest = hashlib.sha256()
         with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        # Text extraction logic (sync for simplicity, could be async)
-        text, num_pages = extract_text_from_pdf(temp_file_path)
-        
-        # Cleanup
-        os.remove(temp_file_path)
+            while chunk := file.file.read(1024 * 1024):
+                digest.update(chunk)
+                buffer.write(chunk)
+        cache_key = digest.hexdigest()
 
-        if not text:
-            raise HTTPException(status_code=400, detail="Could not extract text from PDF")
+        cached = pdf_cache.get(cache_key)
+        if cached:
+            # Repeat upload: skip pypdf completely
+            print(f"DEBUG: PDF cache hit for {file.filename}")
+            text, num_pages, offsets = cached
+            state.agent.set_context(text, offsets)
+            metadata = state.agent.extract_metadata()
+        else:
+            # Stream pages; start metadata/ticker detection as soon as the first
+            # pages are in while the rest of the document is still being extracted
+            pages = []
+            num_chars = 0
+            metadata_future = None
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                try:
+                    for _, page_text in iter_pdf_pages(temp_file_path):
+                        pages.append(page_text)
+                        num_chars += len(page_text)
+                        if metadata_future is None and num_chars >= METADATA_CONTEXT_CHARS:
+                            metadata_future = pool.submit(state.agent.extract_metadata, "".join(pages))
+                except Exception as e:
+                    # Corrupt, truncated or encrypted PDF: a client error, not a server one
+                    raise HTTPException(status_code=400, detail=f"Could not read PDF: {str(e)}")
 
-        state.agent.set_context(text)
-        
-        # Extract metrics for dashboard
-        metrics = state.agent.extract_metrics()
+                text = "".join(pages)
+                num_pages = len(pages)
+
+                if not text:
+                    raise HTTPException(status_code=400, detail="Could not extract text from PDF")
+
+                offsets = page_offsets(pages)
+                pdf_cache.put(cache_key, text, offsets)
+                state.agent.set_context(text, offsets)
+                metadata = metadata_future.result() if metadata_future else state.agent.extract_metadata()
+
+        # Extract metrics for dashboard (reusing the metadata resolved above)
+        metrics = state.agent.extract_metrics(metadata=metadata)
         
-        # Extract metadata for sidebar
-        metadata = state.agent.extract_metadata()
+        # Metadata for sidebar
         if metadata:
+            metadata = dict(metadata)
             metadata["pages_analyzed"] = num_pages
             metadata["data_source"] = file.filename
 
@@ -104,8 +147,14 @@ async def upload_pdf(file: UploadFile = File(...)):
             "metadata": metadata
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
+    finally:
+        # Cleanup
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
 
 @app.post("/api/analyze")
 async def analyze_stock(request: AnalyzeRequest):
@@ -132,6 +181,46 @@ async def analyze_stock(request: AnalyzeRequest):
         print(f"ERROR in /api/analyze: {e}")
         raise HTTPException(status_code=500, detail=f"Error analyzing stock: {str(e)}")
 
+@app.post("/api/analyze_batch")
+async def analyze_batch(request: BatchAnalyzeRequest):
+    """Analyze many tickers; streams one JSON line per ticker as each finishes."""
+    if not state.agent:
+        try:
+            state.agent = FinancialAnalystAgent()
+        except:
+             raise HTTPException(status_code=400, detail="Agent not initialized. Please set API keys first.")
+
+    from fastapi.responses import StreamingResponse
+
+    scheduler = BatchScheduler(state.agent)
+    print(f"DEBUG: Batch analysis of {len(request.tickers)} tickers")
+
+    def ndjson():
+        for result in scheduler.run(request.tickers):
+            yield json.dumps(result, default=str) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.post("/api/sentiment_batch")
+async def sentiment_batch(request: BatchSentimentRequest):
+    """Watchlist sentiment from a few combined NewsAPI queries instead of per-ticker lookups."""
+    if not state.agent:
+        try:
+            state.agent = FinancialAnalystAgent()
+        except:
+             raise HTTPException(status_code=400, detail="Agent not initialized. Please set API keys first.")
+
+    from fastapi.concurrency import run_in_threadpool
+
+    watchlist = {ticker: request.company_names.get(ticker) for ticker in request.tickers}
+    try:
+        results = await run_in_threadpool(state.agent.sentiment_analyzer.get_batch_sentiment,
+                                          watchlist, request.trend_days)
+        return {"sentiment": results}
+    except Exception as e:
+        print(f"ERROR in /api/sentiment_batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Error analyzing sentiment: {str(e)}")
+
 @app.post("/api/chat")
 async def chat(request: ChatRequest):
     if not state.agent:
@@ -185,6 +274,11 @@ async def export_pdf():
         print(f"PDF Export Error: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
 
+@app.get("/api/rate_limit")
+async def rate_limit_status():
+    """Current Alpha Vantage budget (tokens left, wait a call made now would incur) and outbound HTTP counters."""
+    return {"alpha_vantage": alpha_vantage_limiter.status(), "http": default_http_client.stats()}
+
 @app.get("/api/env")
 async def get_env():
     return {
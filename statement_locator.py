@@ -0,0 +1,130 @@
+"""
+Financial Statement Page Locator
+Scores each page of a report for statement content so LLM prompts can be built
+from the pages that matter instead of the cover and table of contents
+"""
+
+import re
+from typing import Dict, List, Optional
+
+# Pseudo-page size used when page boundaries are unknown (e.g. synthetic contexts)
+DEFAULT_PAGE_CHARS = 3000
+
+# Characters of the first page always kept for company name / fiscal year
+HEADER_CHARS = 1500
+
+# Per category: (heading patterns, line-item patterns). Headings weigh more.
+STATEMENT_PATTERNS = {
+    "income_statement": (
+        [r"statements? of (?:consolidated )?(?:operations|income|earnings)",
+         r"income statements?", r"profit and loss"],
+        [r"total (?:net )?revenues?", r"net (?:income|earnings|loss)", r"gross (?:profit|margin)",
+         r"operating income", r"earnings per share", r"cost of (?:sales|revenues?)", r"diluted"],
+    ),
+    "balance_sheet": (
+        [r"balance sheets?", r"statements? of financial position"],
+        [r"total assets", r"total liabilities", r"(?:shareholders|stockholders)['’]? equity",
+         r"total current assets", r"total current liabilities", r"retained earnings", r"long-term debt"],
+    ),
+    "cash_flow": (
+        [r"statements? of (?:consolidated )?cash flows?"],
+        [r"operating activities", r"investing activities", r"financing activities",
+         r"capital expenditures?", r"depreciation and amortization", r"cash equivalents"],
+    ),
+    "segments": (
+        [r"segment information", r"reportable segments?"],
+        [r"by segment", r"segment (?:revenues?|results|operating income)", r"geographic"],
+    ),
+    "risk_factors": (
+        [r"risk factors"],
+        [r"could adversely affect", r"material adverse effect", r"uncertaint(?:y|ies)", r"volatility"],
+    ),
+}
+
+_COMPILED = {
+    category: ([re.compile(p, re.IGNORECASE) for p in headings],
+               [re.compile(p, re.IGNORECASE) for p in items])
+    for category, (headings, items) in STATEMENT_PATTERNS.items()
+}
+_TOC_ITEM = re.compile(r"\bitem\s+\d+[a-z]?\b", re.IGNORECASE)
+_NUMBER = re.compile(r"\(?\$?\d[\d,]*\.?\d*\)?")
+
+
+def score_page(text: str) -> Dict[str, float]:
+    """Score one page per statement category (higher = more statement content)."""
+    if not text:
+        return {category: 0.0 for category in _COMPILED}
+
+    # Tables of contents name every statement but carry none of the figures
+    is_toc = len(_TOC_ITEM.findall(text)) >= 5
+    numbers = len(_NUMBER.findall(text))
+    numeric_density = min(1.0, numbers / max(1, len(text) / 40))
+
+    scores = {}
+    for category, (headings, items) in _COMPILED.items():
+        heading_hits = sum(1 for p in headings if p.search(text))
+        item_hits = sum(min(3, len(p.findall(text))) for p in items)
+        score = float(heading_hits * 5 + item_hits)
+        # Statements are tables; prose categories are not
+        if category != "risk_factors":
+            score *= 0.5 + numeric_density
+        if is_toc:
+            score *= 0.1
+        scores[category] = round(score, 2)
+    return scores
+
+
+class StatementIndex:
+    """Page-level index of statement content built once per document"""
+
+    def __init__(self, text: str, page_offsets: Optional[List[int]] = None):
+        if not page_offsets:
+            page_offsets = list(range(0, len(text), DEFAULT_PAGE_CHARS)) or [0]
+
+        bounds = list(page_offsets) + [len(text)]
+        self.pages = [text[bounds[i]:bounds[i + 1]] for i in range(len(page_offsets))]
+        self.scores = [score_page(page) for page in self.pages]
+
+    def best_pages(self, category: str, top_n: int = 3) -> List[int]:
+        """Indices of the highest-scoring pages for a category."""
+        ranked = sorted(range(len(self.pages)), key=lambda i: self.scores[i][category], reverse=True)
+        return [i for i in ranked[:top_n] if self.scores[i][category] > 0]
+
+    def build_context(self, budget: int) -> str:
+        """
+        Build a prompt context of at most `budget` characters from the first page
+        header plus the best statement pages, kept in document order.
+        """
+        if not self.pages:
+            return ""
+
+        # Take the top page of every category first so each statement is represented,
+        # then fill the remaining budget by overall score
+        selected = []
+        for category in _COMPILED:
+            for i in self.best_pages(category, top_n=1):
+                if i not in selected:
+                    selected.append(i)
+        by_total = sorted(range(len(self.pages)), key=lambda i: sum(self.scores[i].values()), reverse=True)
+        selected += [i for i in by_total if i not in selected and sum(self.scores[i].values()) > 0]
+
+        if not selected:
+            return "".join(self.pages)[:budget]
+
+        if 0 in selected:
+            # The first page is itself relevant: include it whole instead of a header
+            selected.remove(0)
+            selected.insert(0, 0)
+            header = ""
+        else:
+            header = self.pages[0][:HEADER_CHARS]
+        remaining = budget - len(header)
+        chosen = {}
+        for i in selected:
+            if remaining <= 0:
+                break
+            block = f"\n[Page {i + 1}]\n{self.pages[i]}"[:remaining]
+            chosen[i] = block
+            remaining -= len(block)
+
+        return header + "".join(chosen[i] for i in sorted(chosen))
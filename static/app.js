@@ -1666,9 +1666,24 @@ document.addEventListener('DOMContentLoaded', () => {
 
             const aiMsg = addMessage('', 'ai');
             const contentDiv = aiMsg.querySelector('.content');
-            let fullText = "";
             let buffer = "";
 
+            // Text is rendered into segments placed between chart nodes, so
+            // re-rendering markdown never touches charts that are already drawn
+            let textDiv = null;
+            let segmentText = "";
+            const appendText = (t) => {
+                if (!t) return;
+                if (!textDiv) {
+                    textDiv = document.createElement('div');
+                    contentDiv.appendChild(textDiv);
+                    segmentText = "";
+                }
+                segmentText += t;
+                textDiv.innerHTML = marked.parse(segmentText);
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            };
+
             const reader = res.body.getReader();
             const decoder = new TextDecoder();
 
@@ -1679,15 +1694,15 @@ document.addEventListener('DOMContentLoaded', () => {
                 const chunk = decoder.decode(value, { stream: true });
                 buffer += chunk;
 
-                const jsonStart = buffer.indexOf('__JSON_START__');
-                const jsonEnd = buffer.indexOf('__JSON_END__');
+                let jsonStart = buffer.indexOf('__JSON_START__');
+                let jsonEnd = buffer.indexOf('__JSON_END__');
 
-                if (jsonStart !== -1 && jsonEnd !== -1) {
+                // A turn with several chart tool calls sends several blocks
+                while (jsonStart !== -1 && jsonEnd !== -1) {
                     const jsonStr = buffer.substring(jsonStart + 14, jsonEnd);
                     try {
                         const jsonObj = JSON.parse(jsonStr);
-                        fullText += buffer.substring(0, jsonStart);
-                        contentDiv.innerHTML = marked.parse(fullText);
+                        appendText(buffer.substring(0, jsonStart));
 
                         // Render chart similar to addMessage
                         if (jsonObj.chart_data) {
@@ -1733,17 +1748,21 @@ document.addEventListener('DOMContentLoaded', () => {
                                 `;
                                 contentDiv.appendChild(metricsDiv);
                             }
+                            // Text after the chart starts a new segment below it
+                            textDiv = null;
                         }
 
-                        buffer = buffer.substring(jsonEnd + 12);
                     } catch (e) {
                         console.error("JSON Parse error:", e);
                     }
-                } else if (jsonStart === -1) {
-                    fullText += buffer;
-                    contentDiv.innerHTML = marked.parse(fullText);
+                    buffer = buffer.substring(jsonEnd + 12);
+                    jsonStart = buffer.indexOf('__JSON_START__');
+                    jsonEnd = buffer.indexOf('__JSON_END__');
+                }
+                // Hold back a partial chart block until its end marker arrives
+                if (jsonStart === -1 && buffer) {
+                    appendText(buffer);
                     buffer = "";
-                    chatMessages.scrollTop = chatMessages.scrollHeight;
                 }
             }
 
@@ -0,0 +1,142 @@
+"""
+Offline Symbol Directory
+In-memory index over an exchange listing CSV (Alpha Vantage LISTING_STATUS format)
+so ticker search and ticker/company validation do not need SYMBOL_SEARCH calls
+"""
+
+import os
+import re
+import csv
+import math
+import threading
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+SYMBOL_DIRECTORY_CSV = os.getenv("SYMBOL_DIRECTORY_CSV", os.path.join("data", "listing_status.csv"))
+
+# Minimum fuzzy score for a company-name match to be trusted without the API
+MIN_NAME_SCORE = 0.6
+
+CORPORATE_SUFFIXES = frozenset(
+    "inc incorporated corp corporation co company ltd limited plc llc lp sa ag nv se "
+    "holdings holding group the class common stock shares ordinary adr ads".split()
+)
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_name(name: str) -> List[str]:
+    """Lowercase name tokens without punctuation, corporate suffixes or share-class letters
+    ("Alphabet Inc - Class A" -> ["alphabet"])."""
+    tokens = _NON_WORD.sub(" ", name.lower()).split()
+    return [t for t in tokens if t not in CORPORATE_SUFFIXES and len(t) > 1]
+
+
+class SymbolDirectory:
+    """Exact-symbol index plus an inverted index over normalized company-name tokens"""
+
+    def __init__(self, rows: List[Dict[str, str]]):
+        self.symbols: List[str] = []
+        self.names: List[str] = []
+        self.asset_types: List[str] = []
+        self._name_tokens: List[List[str]] = []
+        self._by_symbol: Dict[str, List[int]] = defaultdict(list)  # symbol -> entry ids
+        self._postings = defaultdict(list)  # name token -> entry ids
+
+        for row in rows:
+            symbol = (row.get("symbol") or "").strip().upper()
+            name = (row.get("name") or "").strip()
+            if not symbol or not name:
+                continue
+            entry_id = len(self.symbols)
+            self.symbols.append(symbol)
+            self.names.append(name)
+            self.asset_types.append((row.get("assetType") or "").strip())
+            tokens = normalize_name(name)
+            self._name_tokens.append(tokens)
+            for token in set(tokens):
+                self._postings[token].append(entry_id)
+            self._by_symbol[symbol].append(entry_id)
+
+        n = max(1, len(self.symbols))
+        self._idf = {token: math.log(1 + n / len(ids)) for token, ids in self._postings.items()}
+
+    @classmethod
+    def from_csv(cls, path: str) -> "SymbolDirectory":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def lookup(self, symbol: str) -> List[int]:
+        """Entry ids listed under exactly this symbol."""
+        return list(self._by_symbol.get(symbol.strip().upper(), ()))
+
+    def name_score(self, entry_id: int, company_name: str) -> float:
+        """0-1 similarity between a listing name and a company name."""
+        query = normalize_name(company_name)
+        tokens = self._name_tokens[entry_id]
+        if not query or not tokens:
+            return 0.0
+        shared = set(query) & set(tokens)
+        weight = lambda ts: sum(self._idf.get(t, 1.0) for t in set(ts))
+        overlap = weight(shared) / max(weight(query), weight(tokens))
+        ratio = SequenceMatcher(None, " ".join(query), " ".join(tokens)).ratio()
+        return 0.7 * overlap + 0.3 * ratio
+
+    def search(self, company_name: str, limit: int = 5) -> List[Tuple[str, str, float]]:
+        """Best (symbol, name, score) matches for a company name, highest score first."""
+        candidates = set()
+        for token in set(normalize_name(company_name)):
+            candidates.update(self._postings.get(token, ()))
+
+        scored = []
+        for entry_id in candidates:
+            score = self.name_score(entry_id, company_name)
+            # Prefer common stock over funds/warrants sharing the issuer's name
+            if self.asset_types[entry_id] and self.asset_types[entry_id] != "Stock":
+                score *= 0.9
+            # Among share classes, prefer the shorter (primary) symbol
+            score -= 0.001 * len(self.symbols[entry_id])
+            scored.append((self.symbols[entry_id], self.names[entry_id], round(score, 4)))
+        scored.sort(key=lambda item: item[2], reverse=True)
+        return scored[:limit]
+
+    def best_match(self, company_name: str) -> Optional[str]:
+        """Ticker for a company name, or None if no confident local match."""
+        matches = self.search(company_name, limit=1)
+        if matches and matches[0][2] >= MIN_NAME_SCORE:
+            return matches[0][0]
+        return None
+
+    def validate(self, ticker: str, company_name: str) -> Optional[str]:
+        """
+        Check a ticker against a company name.
+
+        Returns the ticker if its listing matches the name, a corrected ticker if
+        the name confidently matches another listing, or None if undecided locally.
+        """
+        if any(self.name_score(i, company_name) >= MIN_NAME_SCORE for i in self.lookup(ticker)):
+            return ticker
+        return self.best_match(company_name)
+
+
+_shared_directory = None
+_shared_directory_lock = threading.Lock()
+
+
+def get_symbol_directory() -> Optional[SymbolDirectory]:
+    """Process-wide directory loaded once from SYMBOL_DIRECTORY_CSV (None if the file is missing)."""
+    global _shared_directory
+    with _shared_directory_lock:
+        if _shared_directory is None:
+            if not os.path.exists(SYMBOL_DIRECTORY_CSV):
+                return None
+            try:
+                _shared_directory = SymbolDirectory.from_csv(SYMBOL_DIRECTORY_CSV)
+                print(f"DEBUG: Loaded {len(_shared_directory)} listings from {SYMBOL_DIRECTORY_CSV}")
+            except Exception as e:
+                print(f"Symbol directory load failed: {e}")
+                return None
+        return _shared_directory
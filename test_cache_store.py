@@ -0,0 +1,85 @@
+import time
+
+from cache_store import MemoryLRUCache, SQLiteCache, TieredCache, cache_path
+
+
+def test_sqlite_cache_round_trip_and_expiry(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    cache.set("live", {"a": 1}, ttl=60)
+    cache.set("expired", {"a": 2}, ttl=60)
+    cache._conn.execute("UPDATE cache SET expires = ? WHERE key = 'expired'", (time.time() - 1,))
+
+    assert cache.get("live") == {"a": 1}
+    assert cache.get("expired") is None
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_sqlite_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    SQLiteCache(path).set("key", [1, 2, 3])
+    assert SQLiteCache(path).get("key") == [1, 2, 3]
+
+
+def test_sqlite_contains_does_not_count_or_touch(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    cache.set("key", 1, ttl=60)
+    accessed = cache._conn.execute("SELECT accessed FROM cache").fetchone()[0]
+
+    assert cache.contains("key")
+    assert not cache.contains("missing")
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 0
+    assert cache._conn.execute("SELECT accessed FROM cache").fetchone()[0] == accessed
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryLRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_memory_contains_does_not_promote():
+    cache = MemoryLRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.contains("a")
+    cache.set("c", 3)
+    assert not cache.contains("a")
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 0
+
+
+def test_memory_cache_expiry():
+    cache = MemoryLRUCache()
+    cache.set("key", 1, expires=time.time() - 1)
+    assert not cache.contains("key")
+    assert cache.get("key") is None
+
+
+def test_tiered_cache_promotes_without_extending_expiry(tmp_path):
+    persistent = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    persistent.set("key", {"v": 1}, ttl=60)
+    expires = persistent.get_entry("key")[1]
+    cache = TieredCache(MemoryLRUCache(), persistent)
+
+    assert cache.get("key") == {"v": 1}
+    assert cache.memory.get_entry("key") == ({"v": 1}, expires)
+
+
+def test_tiered_contains_checks_both_tiers(tmp_path):
+    cache = TieredCache(MemoryLRUCache(), SQLiteCache(str(tmp_path / "cache.sqlite")))
+    cache.persistent.set("key", 1)
+    assert cache.contains("key")
+    assert not cache.memory.contains("key")
+    assert not cache.contains("missing")
+
+
+def test_cache_path_follows_the_environment_at_call_time(monkeypatch, tmp_path):
+    monkeypatch.delenv("PRICE_STORE_DIR", raising=False)
+    monkeypatch.setenv("FINANALYST_CACHE_DIR", str(tmp_path))
+    assert cache_path("PRICE_STORE_DIR", "prices") == str(tmp_path / "prices")
+    monkeypatch.setenv("PRICE_STORE_DIR", "/elsewhere")
+    assert cache_path("PRICE_STORE_DIR", "prices") == "/elsewhere"
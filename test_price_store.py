@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pytest
+
+from price_store import CLOSE, COMPACT_DAYS, PriceStore
+
+
+def bar(close):
+    return {"1. open": "1", "2. high": "2", "3. low": "0.5", "4. close": str(close), "5. volume": "100"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(str(tmp_path), refresh_seconds=3600)
+
+
+def closes(store, ticker):
+    dates, ohlcv = store.read(ticker)
+    return dates.astype(str).tolist(), ohlcv[:, CLOSE].tolist()
+
+
+def test_first_write_stores_days_oldest_first(store):
+    assert store.append_series("IBM", {"2024-01-03": bar(3), "2024-01-02": bar(2)}) == 2
+    assert closes(store, "ibm") == (["2024-01-02", "2024-01-03"], [2.0, 3.0])
+
+
+def test_last_stored_bar_is_rewritten(store):
+    store.append_series("IBM", {"2024-01-02": bar(1.5), "2024-01-03": bar(1.7)})
+    # The intraday bar of 2024-01-03 is replaced by its final close
+    assert store.append_series("IBM", {"2024-01-03": bar(1.9)}) == 1
+    assert closes(store, "IBM") == (["2024-01-02", "2024-01-03"], [1.5, 1.9])
+
+
+def test_refresh_appends_newer_days_and_ignores_older_ones(store):
+    store.append_series("IBM", {"2024-01-02": bar(1), "2024-01-03": bar(2)})
+    store.append_series("IBM", {"2024-01-02": bar(9), "2024-01-03": bar(3), "2024-01-04": bar(4)})
+    assert closes(store, "IBM") == (["2024-01-02", "2024-01-03", "2024-01-04"], [1.0, 3.0, 4.0])
+
+
+def test_open_memmap_survives_a_rewrite(store):
+    store.append_series("IBM", {"2024-01-02": bar(1), "2024-01-03": bar(2)})
+    _, held = store.read("IBM")
+    store.append_series("IBM", {"2024-01-03": bar(5)})
+    assert held[:, CLOSE].tolist() == [1.0, 5.0]
+
+
+@pytest.mark.parametrize("ticker", [".", "..", "../IBM", "A/B", "", " "])
+def test_invalid_tickers_are_rejected(store, ticker):
+    with pytest.raises(ValueError):
+        store.append_series(ticker, {"2024-01-02": bar(1)})
+
+
+def test_dotted_symbols_are_accepted(store):
+    store.append_series("brk.b", {"2024-01-02": bar(1)})
+    assert closes(store, "BRK.B")[1] == [1.0]
+
+
+def test_get_fetches_compact_then_skips_while_fresh(store):
+    calls = []
+
+    def fetch(full):
+        calls.append(full)
+        return {"Time Series (Daily)": {"2024-01-02": bar(1)}}
+
+    assert store.get("IBM", fetch) is not None
+    store.get("IBM", fetch)
+    assert calls == [False]
+
+
+def test_get_asks_for_full_series_after_a_long_gap(store):
+    old = np.busday_offset(np.datetime64("today", "D"), -(COMPACT_DAYS + 5), roll="backward")
+    store.append_series("IBM", {str(old): bar(1)})
+    store._write_meta("IBM", {"refreshed": 0})
+    calls = []
+    store.get("IBM", lambda full: calls.append(full) or {})
+    assert calls == [True]
+
+
+def test_get_without_data_returns_none(store):
+    assert store.get("IBM", lambda full: {"Information": "rate limited"}) is None
+
+
+def test_refresh_does_not_map_the_files(store, monkeypatch):
+    store.append_series("IBM", {"2024-01-02": bar(1)})
+    # Windows cannot resize a file while a mapping of it is open
+    monkeypatch.setattr(store, "read", lambda ticker: pytest.fail("append_series mapped the files"))
+    store.append_series("IBM", {"2024-01-02": bar(2), "2024-01-03": bar(3)})
+    monkeypatch.undo()
+    assert closes(store, "IBM")[1] == [2.0, 3.0]
+
+
+def test_rows_left_by_an_interrupted_write_are_dropped(store):
+    store.append_series("IBM", {"2024-01-02": bar(1)})
+    # Simulate a crash after ohlcv.bin got two more rows but dates.bin did not
+    with open(f"{store._dir('IBM')}/ohlcv.bin", "ab") as f:
+        f.write(np.ones((2, 5)).tobytes())
+    assert closes(store, "IBM")[1] == [1.0]
+
+    store.append_series("IBM", {"2024-01-03": bar(3)})
+    assert closes(store, "IBM") == (["2024-01-02", "2024-01-03"], [1.0, 3.0])
+    assert os.path.getsize(f"{store._dir('IBM')}/ohlcv.bin") == 2 * 5 * 8
@@ -1,12 +1,34 @@
 import os
 import time
+import tempfile
 from dotenv import load_dotenv
-from agent import FinancialAnalystAgent
+from network_stubs import isolated_cache_env, start_stub_server
 
 # Load env for API keys
 load_dotenv()
 
 def test_large_context():
+    # NETWORK_STUBS=record captures live responses to fixtures; NETWORK_STUBS=replay runs offline from them
+    stub_mode = os.getenv("NETWORK_STUBS")
+    if not stub_mode:
+        run_large_context()
+        return
+
+    server = start_stub_server(mode=stub_mode)
+    try:
+        with tempfile.TemporaryDirectory(prefix="finanalyst-stub-cache-", ignore_cleanup_errors=True) as cache_dir:
+            # Cache paths are read when the shared caches are first created, so set them first
+            os.environ.update(isolated_cache_env(cache_dir))
+            os.environ.update(server.env())
+            os.environ.setdefault("GROQ_API_KEY", "stub")
+            print(f"Using {stub_mode} stub server at {server.base_url}, caches in {cache_dir}")
+            run_large_context()
+    finally:
+        server.stop()
+
+def run_large_context():
+    from agent import FinancialAnalystAgent
+
     print("Initializing Agent...")
     try:
         agent = FinancialAnalystAgent()
@@ -0,0 +1,58 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_calls_within_budget_do_not_wait(clock):
+    limiter = RateLimiter(per_minute=5, per_day=25)
+    assert all(limiter.acquire() for _ in range(5))
+    assert clock.sleeps == []
+    assert limiter.status()["tokens_day"] == 20
+
+
+def test_empty_minute_bucket_waits_for_a_token(clock):
+    limiter = RateLimiter(per_minute=5, max_wait=30)
+    for _ in range(5):
+        limiter.acquire()
+    assert limiter.acquire()
+    # One token refills every 12 seconds
+    assert clock.sleeps == [pytest.approx(12)]
+    assert limiter.status()["total_wait_seconds"] == pytest.approx(12)
+
+
+def test_wait_beyond_max_wait_is_refused_without_consuming(clock):
+    limiter = RateLimiter(per_minute=5, max_wait=5)
+    for _ in range(5):
+        limiter.acquire()
+    assert not limiter.acquire()
+    assert clock.sleeps == []
+    assert limiter.status()["calls"] == 5
+
+
+def test_exhausted_daily_budget_is_refused(clock):
+    limiter = RateLimiter(per_minute=60, per_day=2)
+    assert limiter.acquire() and limiter.acquire()
+    assert not limiter.acquire(max_wait=600)
+    assert limiter.status()["tokens_day"] == 0
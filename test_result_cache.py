@@ -0,0 +1,68 @@
+import threading
+import time
+
+from result_cache import StaleWhileRevalidateCache
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_miss_computes_then_serves_fresh():
+    cache = StaleWhileRevalidateCache(ttl=60, grace=60)
+    calls = []
+    compute = lambda: calls.append(1) or {"v": len(calls)}
+
+    first = cache.get("key", compute)
+    second = cache.get("key", compute)
+    assert first["value"] == second["value"] == {"v": 1}
+    assert not second["stale"]
+    assert cache.stats()["miss"] == 1 and cache.stats()["fresh"] == 1
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    cache = StaleWhileRevalidateCache(ttl=0, grace=60)
+    cache.get("key", lambda: "old")
+    release = threading.Event()
+    calls = []
+
+    def slow_compute():
+        calls.append(1)
+        release.wait(2)
+        return "new"
+
+    result = cache.get("key", slow_compute)
+    assert result["value"] == "old" and result["stale"]
+    assert cache.get("key", slow_compute)["value"] == "old"
+    assert cache.stats()["refreshes"] == 1
+    release.set()
+    assert wait_for(lambda: cache.get("key", lambda: "unused")["value"] == "new")
+    assert len(calls) == 1
+
+
+def test_uncacheable_results_are_returned_but_not_kept():
+    cache = StaleWhileRevalidateCache(ttl=60, grace=60)
+    partial = lambda value: not value["rate_limit"]
+
+    assert cache.get("key", lambda: {"rate_limit": True}, partial)["value"] == {"rate_limit": True}
+    assert cache.get("key", lambda: {"rate_limit": False}, partial)["value"] == {"rate_limit": False}
+    assert cache.stats()["miss"] == 2
+
+
+def test_uncacheable_refresh_keeps_the_stale_entry():
+    cache = StaleWhileRevalidateCache(ttl=0, grace=60)
+    partial = lambda value: not value["rate_limit"]
+    cache.get("key", lambda: {"rate_limit": False}, partial)
+
+    cache.get("key", lambda: {"rate_limit": True}, partial)
+    assert wait_for(lambda: cache.stats()["refreshes"] == 1 and not cache._refreshing)
+    assert cache.get("key", lambda: {"rate_limit": True}, partial)["value"] == {"rate_limit": False}
+
+
+def test_none_results_are_not_cached():
+    cache = StaleWhileRevalidateCache(ttl=60, grace=60)
+    assert cache.get("key", lambda: None) is None
+    assert cache.get("key", lambda: "value")["value"] == "value"
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from sentiment_history import SentimentHistory
+
+TODAY = datetime.now(timezone.utc)
+
+
+def article(url, days_ago=0):
+    return {"url": url, "publishedAt": (TODAY - timedelta(days=days_ago)).strftime("%Y-%m-%dT%H:%M:%SZ")}
+
+
+@pytest.fixture
+def history(tmp_path):
+    return SentimentHistory(str(tmp_path / "history.sqlite"))
+
+
+def test_articles_are_counted_once(history):
+    assert history.record("ibm", [article("a"), article("b", 1)], [0.5, -0.5]) == 2
+    assert history.record("IBM", [article("a"), article("b", 1)], [0.5, -0.5]) == 0
+    assert sum(day["count"] for day in history.daily("IBM", 7)) == 2
+
+
+def test_late_articles_from_other_queries_are_added(history):
+    history.record("IBM", [article("new")], [0.4])
+    # Published before the newest stored article, returned later (e.g. by the batch route)
+    assert history.record("IBM", [article("late", 2), article("new")], [-0.2, 0.4]) == 1
+    assert history.trend("IBM", 3, TODAY.date()) == [-0.2, -0.2, 0.4]
+
+
+def test_articles_are_tracked_per_ticker(history):
+    history.record("IBM", [article("shared")], [0.3])
+    assert history.record("MSFT", [article("shared")], [0.3]) == 1
+
+
+def test_articles_older_than_the_seen_window_are_ignored(tmp_path):
+    history = SentimentHistory(str(tmp_path / "history.sqlite"), seen_days=10)
+    assert history.record("IBM", [article("old", 30), {"url": "undated"}], [0.9, 0.9]) == 0
+
+
+def test_trend_carries_the_previous_mean_forward(history):
+    history.record("IBM", [article("a", 5), article("b", 5)], [0.2, 0.6])
+    assert history.trend("IBM", 3, TODAY.date()) == [0.4, 0.4, 0.4]
+    assert history.trend("MSFT", 2, TODAY.date()) == [0.0, 0.0]
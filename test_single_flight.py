@@ -0,0 +1,46 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return "value"
+
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", slow)))
+    leader.start()
+    started.wait(2)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("key", slow))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    deadline = time.time() + 2
+    while flights.stats()["shared"] < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(2)
+
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+    assert flights.stats() == {"executed": 1, "shared": 3}
+
+
+def test_errors_reach_every_caller_and_are_not_kept():
+    flights = SingleFlight()
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flights.do("key", fail)
+    assert flights.do("key", lambda: "recovered") == "recovered"
@@ -0,0 +1,86 @@
+from sentiment_tool import TickerMatcher, batch_queries, news_keywords
+
+WATCHLIST = {
+    "T": "AT&T Inc",
+    "TGT": "Target Corporation",
+    "JNJ": "Johnson & Johnson",
+    "META": "Meta Platforms, Inc.",
+}
+
+
+def test_news_keywords_keep_ampersand_names():
+    assert news_keywords("AT&T Inc") == ["at&t"]
+    assert news_keywords("Johnson & Johnson") == ["johnson & johnson"]
+
+
+def test_news_keywords_add_short_form_without_descriptors():
+    assert news_keywords("Meta Platforms, Inc.") == ["meta platforms", "meta"]
+
+
+def test_news_keywords_reject_stopwords_and_short_words():
+    assert news_keywords("The Inc") == []
+    assert news_keywords("AT Corp") == []
+    assert news_keywords("General Holdings") == []
+
+
+def test_ordinary_words_do_not_match_ampersand_names():
+    matcher = TickerMatcher(WATCHLIST)
+    assert matcher.match("Shares rose at the open after Target Corporation raised its outlook") == {"TGT"}
+
+
+def test_everyday_word_names_need_the_full_name():
+    assert news_keywords("Target Corporation") == ["target corporation"]
+    assert news_keywords("Target") == []
+    matcher = TickerMatcher({"TGT": "Target Corporation", "AAPL": "Apple Inc"})
+    assert matcher.match("Analyst raises Apple price target to $250") == {"AAPL"}
+    assert matcher.match("TGT slips as Target Corporation trims guidance") == {"TGT"}
+
+
+def test_ampersand_names_match():
+    matcher = TickerMatcher(WATCHLIST)
+    assert matcher.match("AT&T raises its dividend") == {"T"}
+    assert matcher.match("Johnson & Johnson settles talc suits") == {"JNJ"}
+
+
+def test_short_form_and_punctuation_between_words_match():
+    matcher = TickerMatcher(WATCHLIST)
+    assert matcher.match("Meta unveils new smart glasses") == {"META"}
+    assert matcher.match("Analysts upgrade Meta-Platforms") == {"META"}
+
+
+def test_single_letter_symbols_need_dollar_sign():
+    matcher = TickerMatcher(WATCHLIST)
+    assert matcher.match("T is a letter") == set()
+    assert matcher.match("Options on $T are busy") == {"T"}
+
+
+def test_word_symbols_need_dollar_sign():
+    matcher = TickerMatcher({"ON": "ON Semiconductor Corp", "IT": "Gartner Inc"})
+    assert matcher.match("Stocks moved ON the news about IT budgets") == set()
+    assert matcher.match("$ON and $IT rallied") == {"ON", "IT"}
+
+
+def test_batch_queries_qualify_symbols_and_use_news_keywords():
+    queries = batch_queries(WATCHLIST)
+    assert queries == ['(("$T" OR TGT OR JNJ OR META) AND (stock OR market OR finance)) OR "at&t" '
+                       'OR "target corporation" OR "johnson & johnson" OR "meta platforms" OR "meta"']
+    assert '"at"' not in queries[0] and '"T"' not in queries[0]
+
+
+def test_short_symbols_are_never_sent_bare():
+    query = batch_queries({"F": "Ford Motor Co", "ON": None, "IT": "Gartner Inc"})[0]
+    assert '"$F"' in query and '"$ON"' in query and '"$IT"' in query
+    assert " F " not in query and '"ON"' not in query and '"IT"' not in query
+
+
+def test_batch_queries_cap_tickers_per_query():
+    watchlist = {f"TK{i}X": None for i in range(12)}
+    queries = batch_queries(watchlist, tickers_per_query=5)
+    assert len(queries) == 3
+    assert all(query.count("TK") <= 5 for query in queries)
+
+
+def test_batch_queries_respect_max_chars():
+    queries = batch_queries(WATCHLIST, max_chars=80)
+    assert len(queries) > 1
+    assert all(len(query) <= 80 for query in queries)